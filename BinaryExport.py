@@ -0,0 +1,201 @@
+#!/usr/bin/python3
+import array
+import bisect
+import mmap
+import struct
+import sys
+
+import CardData
+import CategoryData
+import GwentUtils
+import Profiler
+
+"""
+Columnar binary card store. Every numeric field is saved as a fixed width array with one entry per card, sorted by
+ingameId, so the file can be opened with mmap and read without parsing anything. Forked processes share the pages.
+
+Layout (little-endian, every section is aligned to 8 bytes):
+    header      magic, version, card count, column count, locale count
+    locales     8 bytes per locale
+    directory   name, array typecode, offset and length of every column
+    columns     the arrays, including the string table
+Localised strings are stored once in a utf-8 blob. The 'strings' column holds the offset of each string in the blob,
+plus a final end offset. Columns like 'name.en-US' hold the index of the card's string, or NO_STRING.
+"""
+MAGIC = b"GWCB"
+VERSION = 1
+HEADER = struct.Struct("<4sIIII")
+LOCALE = struct.Struct("<8s")
+DIRECTORY_ENTRY = struct.Struct("<16sc7xQQ")
+NO_STRING = 0xFFFFFFFF
+
+"""
+Gwent Data ID -> Gwent Client ID mapping. The store uses the client ids from CardData.
+"""
+TIER_CODES = {name: code for code, name in CardData.TIERS.items()}
+TYPE_CODES = {name: code for code, name in CardData.TYPES.items()}
+FACTION_CODES = {name: code for code, name in CardData.FACTIONS.items()}
+RARITY_CODES = {name: code for code, name in CardData.RARITIES.items()}
+CARD_SET_CODES = {name: code for code, name in CardData.CARD_SETS.items()}
+
+# Name, array typecode, and how to get the value from a card. Missing values are 0, or -1 where 0 is a valid value.
+NUMERIC_COLUMNS = [
+    ("ingameId", "i", lambda card: int(card['ingameId'])),
+    ("strength", "h", lambda card: card['strength']),
+    ("provision", "h", lambda card: card['provision']),
+    ("tier", "B", lambda card: TIER_CODES.get(card['type'], 0)),
+    ("type", "B", lambda card: TYPE_CODES.get(card['cardType'], 0)),
+    ("faction", "B", lambda card: FACTION_CODES.get(card['faction'], 0)),
+    ("rarity", "B", lambda card: RARITY_CODES.get(_variation(card).get('rarity'), 0)),
+    ("reach", "h", lambda card: card.get('reach', -1)),
+    ("armor", "h", lambda card: card.get('armor', -1)),
+    ("availability", "h", lambda card: CARD_SET_CODES.get(_variation(card).get('availability'), -1)),
+    # Category bits 0-63 and 64-127, from categoryMask.
+    ("categoriesLow", "Q", lambda card: _category_mask(card) & 0xFFFFFFFFFFFFFFFF),
+    ("categoriesHigh", "Q", lambda card: _category_mask(card) >> 64),
+]
+TEXT_FIELDS = ["name", "info", "flavor"]
+
+
+def _variation(card):
+    # Every card has a single variation.
+    return next(iter(card['variations'].values()))
+
+
+def _category_mask(card):
+    # Cards saved before categoryMask existed only have categoryIds.
+    if 'categoryMask' in card:
+        return int(card['categoryMask'], 16)
+    return CategoryData.get_mask(card.get('categoryIds') or [])
+
+
+def _align(data):
+    data.extend(b"\0" * (-len(data) % 8))
+
+
+def save_binary(filepath, cards, locales):
+    # cards is anything GwentUtils.iter_entries takes.
+    cards = sorted((card for _, card in GwentUtils.iter_entries(cards)), key=lambda card: int(card['ingameId']))
+
+    columns = []
+    for name, typecode, get_value in NUMERIC_COLUMNS:
+        columns.append((name, array.array(typecode, [get_value(card) for card in cards])))
+
+    # Every distinct string is only stored once.
+    string_indexes = {}
+    blob = bytearray()
+    string_offsets = array.array("I")
+    for field in TEXT_FIELDS:
+        for locale in locales:
+            indexes = array.array("I")
+            for card in cards:
+                text = (card.get(field) or {}).get(locale)
+                if text is None:
+                    indexes.append(NO_STRING)
+                    continue
+                index = string_indexes.get(text)
+                if index is None:
+                    index = len(string_offsets)
+                    string_indexes[text] = index
+                    string_offsets.append(len(blob))
+                    blob.extend(text.encode("utf-8"))
+                indexes.append(index)
+            columns.append((field + "." + locale, indexes))
+    string_offsets.append(len(blob))
+    columns.append(("strings", string_offsets))
+    columns.append(("stringData", array.array("B", blob)))
+
+    data = bytearray(HEADER.pack(MAGIC, VERSION, len(cards), len(columns), len(locales)))
+    for locale in locales:
+        data.extend(LOCALE.pack(locale.encode("ascii")))
+    _align(data)
+
+    offset = len(data) + DIRECTORY_ENTRY.size * len(columns)
+    offset += -offset % 8
+    directory = bytearray()
+    for name, values in columns:
+        directory.extend(DIRECTORY_ENTRY.pack(name.encode("ascii"), values.typecode.encode("ascii"), offset, len(values)))
+        size = len(values) * values.itemsize
+        offset += size + (-size % 8)
+    data.extend(directory)
+    _align(data)
+
+    for _, values in columns:
+        if sys.byteorder == "big":
+            values.byteswap()
+        data.extend(values.tobytes())
+        _align(data)
+
+    with open(filepath, "wb") as f:
+        f.write(data)
+    Profiler.file_written(filepath)
+    print("Saved binary card store to: %s" % filepath)
+    return len(cards)
+
+
+class CardStore:
+    """
+    Reads a file written by save_binary through mmap. Columns are memoryviews over the mapped file, so opening the store
+    costs the same no matter how many cards it holds.
+        store = CardStore(path)
+        row = store.row("122101")
+        store.column("provision")[row], store.text("name", "en-US", row)
+    """
+    def __init__(self, filepath):
+        with open(filepath, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+
+        magic, version, self.count, column_count, locale_count = HEADER.unpack_from(self._mmap, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("%s is not a version %d card store" % (filepath, VERSION))
+        if sys.byteorder == "big":
+            raise ValueError("Card stores can only be read on little-endian machines")
+
+        offset = HEADER.size
+        self.locales = []
+        for _ in range(locale_count):
+            self.locales.append(LOCALE.unpack_from(self._mmap, offset)[0].rstrip(b"\0").decode("ascii"))
+            offset += LOCALE.size
+        offset += -offset % 8
+
+        self._view = view
+        self._columns = {}
+        for _ in range(column_count):
+            name, typecode, column_offset, length = DIRECTORY_ENTRY.unpack_from(self._mmap, offset)
+            typecode = typecode.decode("ascii")
+            size = length * array.array(typecode).itemsize
+            self._columns[name.rstrip(b"\0").decode("ascii")] = view[column_offset:column_offset + size].cast(typecode)
+            offset += DIRECTORY_ENTRY.size
+
+    def column_names(self):
+        return list(self._columns)
+
+    def column(self, name):
+        # The whole column as a memoryview, one entry per card in ingameId order.
+        return self._columns[name]
+
+    def row(self, ingame_id):
+        # Returns the row of the card, or None if the store doesn't have it.
+        ids = self.column("ingameId")
+        ingame_id = int(ingame_id)
+        row = bisect.bisect_left(ids, ingame_id)
+        if row < len(ids) and ids[row] == ingame_id:
+            return row
+        return None
+
+    def string(self, index):
+        if index == NO_STRING:
+            return None
+        offsets = self.column("strings")
+        return self.column("stringData")[offsets[index]:offsets[index + 1]].tobytes().decode("utf-8")
+
+    def text(self, field, locale, row):
+        return self.string(self.column(field + "." + locale)[row])
+
+    def close(self):
+        for column in self._columns.values():
+            column.release()
+        self._columns = {}
+        self._view.release()
+        self._mmap.close()
@@ -1,6 +1,7 @@
 #!/usr/bin/python3
 import re
 import GwentUtils
+import CategoryData
 
 IMAGE_SIZES = ['original', 'high', 'medium', 'low', 'thumbnail']
 
@@ -80,155 +81,220 @@ CARD_SETS = {
     MERCHANTS_OF_OFIR_SET: "MerchantsOfOfir",
 }
 
+# Cards from these sets can be collected.
+COLLECTIBLE_SETS = {BASE_SET, THRONEBREAKER_SET, UNMILLABLE_SET, CRIMSONCURSE_SET, NOVIGRAD_SET, IRON_JUDGEMENT_SET, MERCHANTS_OF_OFIR_SET}
+
 # Gaunter's 'Higher than 5' and 'Lower than 5' are not actually cards.
 INVALID_TOKENS = ['200175', '200176']
 
-def create_card_json(gwent_data_helper, patch, base_image_url):
-    cards = {}
+# Placeholders that change from card to card. {patch} is the same for every card.
+IMAGE_URL_FIELDS = ["cardId", "variationId", "artId"]
+
+
+def get_image_url_template(patch, base_image_url):
+    # The image url with only the card placeholders left, for clients expanding the urls themselves. See url_template
+    # in create_card_json.
+    if patch is not None:
+        base_image_url = base_image_url.replace("{patch}", patch)
+    return {"url": base_image_url, "sizes": IMAGE_SIZES}
+
+
+def compile_image_urls(patch, base_image_url):
+    # Fills in everything that is the same for every card once. Returns [(image size, url)] with the card placeholders
+    # turned into %(cardId)s etc., so each url is made with a single % instead of a replace per placeholder.
+    url = get_image_url_template(patch, base_image_url)["url"].replace("%", "%%")
+    for field in IMAGE_URL_FIELDS:
+        url = url.replace("{" + field + "}", "%(" + field + ")s")
+    return [(image_size, url.replace("{size}", image_size)) for image_size in IMAGE_SIZES]
+
+
+def update_image_urls(cards, patch, base_image_url, url_template=False):
+    # Sets the image urls of cards created for another patch to the urls they would have in patch, so comparing them
+    # with cards created for patch only finds real changes. The default image url includes the patch, so otherwise
+    # every card with images would look changed. With url_template the image urls are replaced with art.hasImages, like
+    # create_card_json(url_template=True), and cards saved with hasImages get their urls back without it. Cards without
+    # images are left as they are. Updates the cards in place.
+    image_urls = compile_image_urls(patch, base_image_url)
+    for card_id, card in cards.items():
+        for variation_id, variation in card.get('variations', {}).items():
+            art = variation.get('art') or {}
+            if IMAGE_SIZES[0] not in art and not art.get('hasImages'):
+                continue
+            if url_template:
+                for image_size, _ in image_urls:
+                    art.pop(image_size, None)
+                art['hasImages'] = True
+                continue
+            art.pop('hasImages', None)
+            values = {"cardId": card_id, "variationId": variation_id, "artId": art.get('ingameArtId')}
+            for image_size, image_url in image_urls:
+                art[image_size] = image_url % values
+    return cards
 
-    card_templates = gwent_data_helper.card_templates
-    for template_id in card_templates:
-        template = card_templates[template_id]
-        card = {}
-        card_id = template.attrib['Id']
-        card['ingameId'] = card_id
-        card['strength'] = int(template.find('Power').text)
-        tier = int(template.find('Tier').text)
-        card['type'] = TIERS.get(tier)
-        card_type = int(template.find('Type').text)
-        card['cardType'] = TYPES.get(card_type)
-        card['faction'] = FACTIONS.get(int(template.find('FactionId').text))
-        secondaryFaction = template.find('SecondaryFactionId')
-        if secondaryFaction != None and int(secondaryFaction.text) in FACTIONS:
-            card['secondaryFaction'] = FACTIONS.get(int(secondaryFaction.text))
-        card['provision'] = int(template.find('Provision').text)
-        if (tier == LEADER):
-            # Mulligan values are the same for every leader now.
-            card['mulligans'] = 0
-            card['provisionBoost'] = int(template.find('Provision').text)
-
-        maxRange = int(template.find('MaxRange').text)
-        if (maxRange > -1):
-            card['reach'] = maxRange
-
-        card['name'] = {}
-        card['flavor'] = {}
-        for region in GwentUtils.LOCALES:
-            card['name'][region] = gwent_data_helper.card_names.get(region).get(card_id)
-            card['flavor'][region] = gwent_data_helper.flavor_strings.get(region).get(card_id)
-
-        # False by default, will be set to true if collectible or is a token of a released card.
-        card['released'] = False
-
-        # Tooltips
-        card['info'] = {}
-        card['infoRaw'] = {}
-        for locale in GwentUtils.LOCALES:
-            tooltip = gwent_data_helper.tooltips[locale].get(card_id)
-            if tooltip is not None:
-                card['infoRaw'][locale] = tooltip
-                card['info'][locale] = GwentUtils.clean_html(tooltip)
-
-        # Keywords.
-        card['keywords'] = gwent_data_helper.keywords.get(card_id)
-
-        # Units no longer have a row restriction.
-        card['positions'] = ["Melee", "Ranged", "Siege"]
-
-        # Loyalty
-        card['loyalties'] = []
-        placement = template.find('Placement')
-        if placement.attrib['PlayerSide'] != "0":
-            card['loyalties'].append("Loyal")
-        if placement.attrib['OpponentSide'] != "0":
-            card['loyalties'].append("Disloyal")
-
-        # Categories
-        card['categories'] = []
-        card['categoryIds'] = []
-
-        # There are 2 category nodes
-        for node in ["PrimaryCategory", "Categories"]:
-            for multiplier in range(2):
-                # e0, e1
-                e = "e{0}".format(multiplier)
-                categories_sum = int(template.find(node).find(e).attrib['V'])
-                for category, bit in enumerate("{0:b}".format(categories_sum)[::-1]):
-                    if bit == '1':
-                        # e1 categories are off by 64.
-                        adjusted_category = category + (64 * multiplier)
-                        card['categoryIds'].append("card_category_{0}".format(adjusted_category))
-
-        categories_en_us = gwent_data_helper.categories["en-US"]
-        for category_id in card['categoryIds']:
-            if category_id in categories_en_us:
-                card['categories'].append(categories_en_us[category_id])
-
-        # Variations no longer exist in Gwent. To maintain backwards compatability, create 1 variation.
-        card['variations'] = {}
-        variation = {}
-        variation_id = card_id + "00" # Old variation id format.
-
-        availability = int(template.attrib['Availability'])
-
-        variation['variationId'] = variation_id
-
-        variation['availability'] = CARD_SETS[availability]
-        collectible = availability in {BASE_SET, THRONEBREAKER_SET, UNMILLABLE_SET, CRIMSONCURSE_SET, NOVIGRAD_SET, IRON_JUDGEMENT_SET, MERCHANTS_OF_OFIR_SET}
-        variation['collectible'] = collectible
 
+def get_released_card_ids(gwent_data_helper):
+    card_templates = gwent_data_helper.card_templates
+    released = set()
+    for card_id in card_templates:
         # If a card is collectible, we know it has been released.
         # Mark Tactical Advantage as released.
-        if collectible or card_id == "202140":
-            card['released'] = True
-
-        rarity = int(template.find('Rarity').text)
-        variation['rarity'] = RARITIES.get(rarity)
-
-        variation['craft'] = CRAFT_VALUES.get(rarity)
-        variation['mill'] = MILL_VALUES.get(rarity)
-
-        art = {}
-        art_id = template.attrib.get('ArtId')
-        if art_id != None:
-            art['ingameArtId'] = art_id
-
-        if collectible or card_id == "202140": # Get card art for Tactical Advantage
-            for image_size in IMAGE_SIZES:
-                art[image_size] = base_image_url.replace("{patch}", patch) \
-                    .replace("{cardId}", card_id) \
-                    .replace("{variationId}", variation_id) \
-                    .replace("{size}", image_size) \
-                    .replace("{artId}", art_id)
-
-        variation['art'] = art
-
-        card['variations'][variation_id] = variation
-        artist = gwent_data_helper.artists.get(art_id)
-        if artist != None:
-            card['artist'] = artist
-
-        # Add all token cards to the 'related' list.
-        tokens = gwent_data_helper.tokens.get(card_id)
-        card['related'] = tokens
-
-        armor = gwent_data_helper.armor.get(card_id)
-        if armor != None and TYPES.get(card_type) == "Unit":
-            card['armor'] = int(armor)
-
-        cards[card_id] = card
-
-    # Check tokens are correctly marked as released.
-    for card_id in cards:
-        card = cards[card_id]
-        if card['released'] and card.get('related') is not None:
-            for token_id in card.get('related'):
-                if token_id in cards:
-                    cards[token_id]['released'] = token_id not in INVALID_TOKENS
-
-    # Remove any unreleased cards
-    for card_id, card in list(cards.items()):
-        if not card['released']:
-            del cards[card_id]
+        if int(card_templates[card_id].availability) in COLLECTIBLE_SETS or card_id == "202140":
+            released.add(card_id)
+    released.difference_update(INVALID_TOKENS)
+
+    # Every token a released card can create is released too, including the tokens created by those tokens.
+    return gwent_data_helper.token_graph.propagate(released, INVALID_TOKENS)
+
+
+def _create_card(gwent_data_helper, template, image_urls, locales):
+    card = {}
+    card_id = template.id
+    card['ingameId'] = card_id
+    card['strength'] = int(template.power)
+    tier = int(template.tier)
+    card['type'] = TIERS.get(tier)
+    card_type = int(template.type)
+    card['cardType'] = TYPES.get(card_type)
+    card['faction'] = FACTIONS.get(int(template.faction_id))
+    secondaryFaction = template.secondary_faction_id
+    if secondaryFaction != None and int(secondaryFaction) in FACTIONS:
+        card['secondaryFaction'] = FACTIONS.get(int(secondaryFaction))
+    card['provision'] = int(template.provision)
+    if (tier == LEADER):
+        # Mulligan values are the same for every leader now.
+        card['mulligans'] = 0
+        card['provisionBoost'] = int(template.provision)
+
+    maxRange = int(template.max_range)
+    if (maxRange > -1):
+        card['reach'] = maxRange
+
+    card['name'] = {}
+    card['flavor'] = {}
+    for region in locales:
+        card['name'][region] = gwent_data_helper.card_names.get(region).get(card_id)
+        card['flavor'][region] = gwent_data_helper.flavor_strings.get(region).get(card_id)
+
+    # Only released cards are created. See get_released_card_ids.
+    card['released'] = True
+
+    # Tooltips
+    card['info'] = {}
+    card['infoRaw'] = {}
+    for locale in locales:
+        tooltip = gwent_data_helper.tooltips[locale].get(card_id)
+        if tooltip is not None:
+            card['infoRaw'][locale] = tooltip
+            card['info'][locale] = GwentUtils.clean_html(tooltip)
+
+    # Keywords.
+    card['keywords'] = gwent_data_helper.keywords.get(card_id)
+
+    # Units no longer have a row restriction.
+    card['positions'] = ["Melee", "Ranged", "Siege"]
+
+    # Loyalty
+    card['loyalties'] = []
+    if template.player_side != "0":
+        card['loyalties'].append("Loyal")
+    if template.opponent_side != "0":
+        card['loyalties'].append("Disloyal")
+
+    # Categories
+    card['categories'] = []
+    card['categoryIds'] = []
+
+    # There are 2 category nodes, each a 128 bit mask.
+    category_mask = 0
+    for masks in [template.primary_category, template.categories]:
+        mask = CategoryData.get_template_mask(masks)
+        card['categoryIds'] += CategoryData.get_category_ids(mask)
+        category_mask |= mask
+    card['categoryMask'] = CategoryData.format_mask(category_mask)
+
+    # Category names are always in English, whichever locales the cards are created for.
+    category_names = gwent_data_helper.category_names
+    for category_id in card['categoryIds']:
+        if category_id in category_names:
+            card['categories'].append(category_names[category_id])
+
+    # Variations no longer exist in Gwent. To maintain backwards compatability, create 1 variation.
+    card['variations'] = {}
+    variation = {}
+    variation_id = card_id + "00" # Old variation id format.
+
+    availability = int(template.availability)
+
+    variation['variationId'] = variation_id
+
+    variation['availability'] = CARD_SETS[availability]
+    collectible = availability in COLLECTIBLE_SETS
+    variation['collectible'] = collectible
+
+    rarity = int(template.rarity)
+    variation['rarity'] = RARITIES.get(rarity)
+
+    variation['craft'] = CRAFT_VALUES.get(rarity)
+    variation['mill'] = MILL_VALUES.get(rarity)
+
+    art = {}
+    art_id = template.art_id
+    if art_id != None:
+        art['ingameArtId'] = art_id
+
+    if collectible or card_id == "202140": # Get card art for Tactical Advantage
+        if image_urls is None:
+            # The client creates the urls from the image url template.
+            art['hasImages'] = True
+        else:
+            values = {"cardId": card_id, "variationId": variation_id, "artId": art_id}
+            for image_size, image_url in image_urls:
+                art[image_size] = image_url % values
+
+    variation['art'] = art
+
+    card['variations'][variation_id] = variation
+    artist = gwent_data_helper.artists.get(art_id)
+    if artist != None:
+        card['artist'] = artist
+
+    # Add all token cards to the 'related' list.
+    tokens = gwent_data_helper.tokens.get(card_id)
+    card['related'] = tokens
+
+    armor = gwent_data_helper.armor.get(card_id)
+    if armor != None and TYPES.get(card_type) == "Unit":
+        card['armor'] = int(armor)
+
+    return card
+
+
+def create_card_json(gwent_data_helper, patch, base_image_url, locales=None, url_template=False):
+    # Defaults to every locale the helper read.
+    # With url_template, the cards don't include their image urls. Cards with images have art.hasImages instead, and
+    # clients create the urls from get_image_url_template.
+    if locales is None:
+        locales = gwent_data_helper.locales
+    image_urls = None if url_template else compile_image_urls(patch, base_image_url)
+
+    cards = {}
+    released_card_ids = get_released_card_ids(gwent_data_helper)
+
+    card_templates = gwent_data_helper.card_templates
+    for card_id in card_templates:
+        if card_id in released_card_ids:
+            cards[card_id] = _create_card(gwent_data_helper, card_templates[card_id], image_urls, locales)
 
     return cards
+
+
+def iter_card_json(gwent_data_helper, patch, base_image_url, locales=None, url_template=False):
+    # Yields the same (card id, card) pairs as create_card_json, sorted by card id. Each card is only created when it
+    # is needed, so the cards can be saved without holding all of them in memory.
+    if locales is None:
+        locales = gwent_data_helper.locales
+    image_urls = None if url_template else compile_image_urls(patch, base_image_url)
+
+    card_templates = gwent_data_helper.card_templates
+    for card_id in sorted(get_released_card_ids(gwent_data_helper)):
+        yield card_id, _create_card(gwent_data_helper, card_templates[card_id], image_urls, locales)
@@ -0,0 +1,139 @@
+#!/usr/bin/python3
+import bisect
+
+# Fields with one value per card.
+VALUE_FIELDS = ["faction", "secondaryFaction", "type", "cardType"]
+# Fields taken from the card's variations.
+VARIATION_FIELDS = ["rarity", "availability"]
+# Fields with a list of values per card.
+LIST_FIELDS = ["keywords", "categories"]
+# Numeric fields that can be queried by range.
+RANGE_FIELDS = ["provision", "strength"]
+
+
+def _as_list(value):
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return value
+    return [value]
+
+
+class CardIndex:
+    """
+    Indexes the cards from CardData.create_card_json, so cards can be filtered without scanning all of them.
+    E.g. all Gold Skellige units with provision 9 or less:
+        CardIndex(cards).find(faction="Skellige", type="Gold", cardType="Unit", max_provision=9)
+    """
+    def __init__(self, cards):
+        self.cards = cards
+        self._indexes = {}
+        for field in VALUE_FIELDS + VARIATION_FIELDS + LIST_FIELDS:
+            self._indexes[field] = {}
+
+        # Sorted (value, card id) pairs for each range field.
+        self._ranges = {}
+        for field in RANGE_FIELDS:
+            self._ranges[field] = []
+
+        for card_id in cards:
+            card = cards[card_id]
+            for field in VALUE_FIELDS:
+                if card.get(field) is not None:
+                    self._add(field, card[field], card_id)
+            for variation in card['variations'].values():
+                for field in VARIATION_FIELDS:
+                    if variation.get(field) is not None:
+                        self._add(field, variation[field], card_id)
+            for field in LIST_FIELDS:
+                for value in card.get(field) or []:
+                    self._add(field, value, card_id)
+            for field in RANGE_FIELDS:
+                if card.get(field) is not None:
+                    self._ranges[field].append((card[field], card_id))
+
+        for field in RANGE_FIELDS:
+            self._ranges[field].sort()
+        self._range_values = {}
+        for field in RANGE_FIELDS:
+            self._range_values[field] = [value for value, _ in self._ranges[field]]
+
+    def _add(self, field, value, card_id):
+        self._indexes[field].setdefault(value, set()).add(card_id)
+
+    def values(self, field):
+        # All the values of an indexed field e.g. every faction.
+        return sorted(self._indexes[field])
+
+    def _ids_with_any(self, field, values):
+        index = self._indexes[field]
+        values = _as_list(values)
+        if len(values) == 1:
+            return index.get(values[0], set())
+        ids = set()
+        for value in values:
+            ids |= index.get(value, set())
+        return ids
+
+    def _range_bounds(self, field, minimum, maximum):
+        values = self._range_values[field]
+        start = 0 if minimum is None else bisect.bisect_left(values, minimum)
+        end = len(values) if maximum is None else bisect.bisect_right(values, maximum)
+        return start, end
+
+    def _ids_in_range(self, field, start, end):
+        return {card_id for _, card_id in self._ranges[field][start:end]}
+
+    def find_ids(self, faction=None, secondaryFaction=None, type=None, cardType=None, rarity=None, availability=None,
+                 keywords=None, categories=None, min_provision=None, max_provision=None, min_strength=None,
+                 max_strength=None):
+        """
+        Returns the set of ids of the cards that match every filter.
+        Value filters accept a single value or a list of values, matching cards with any of them.
+        keywords and categories match cards that have all of the given values.
+        """
+        sets = []
+        value_filters = [("faction", faction), ("secondaryFaction", secondaryFaction), ("type", type),
+                         ("cardType", cardType), ("rarity", rarity), ("availability", availability)]
+        for field, values in value_filters:
+            if values is not None:
+                sets.append(self._ids_with_any(field, values))
+        for field, values in [("keywords", keywords), ("categories", categories)]:
+            if values is not None:
+                for value in _as_list(values):
+                    sets.append(self._indexes[field].get(value, set()))
+
+        ranges = []
+        for field, minimum, maximum in [("provision", min_provision, max_provision),
+                                        ("strength", min_strength, max_strength)]:
+            if minimum is not None or maximum is not None:
+                ranges.append((field, minimum, maximum))
+
+        if not sets:
+            if not ranges:
+                return set(self.cards)
+            field, minimum, maximum = ranges.pop(0)
+            sets.append(self._ids_in_range(field, *self._range_bounds(field, minimum, maximum)))
+
+        # Intersect starting with the smallest set, so every step is as cheap as possible.
+        sets.sort(key=len)
+        ids = set(sets[0])
+        for other in sets[1:]:
+            if not ids:
+                break
+            ids &= other
+
+        for field, minimum, maximum in ranges:
+            start, end = self._range_bounds(field, minimum, maximum)
+            if end - start < len(ids):
+                ids &= self._ids_in_range(field, start, end)
+            else:
+                # There are fewer candidates left than cards in the range, so check their values directly.
+                ids = {card_id for card_id in ids
+                       if self.cards[card_id].get(field) is not None
+                       and (minimum is None or self.cards[card_id][field] >= minimum)
+                       and (maximum is None or self.cards[card_id][field] <= maximum)}
+
+        return ids
+
+    def find(self, **filters):
+        # Same filters as find_ids. Returns the matching cards sorted by id.
+        return [self.cards[card_id] for card_id in sorted(self.find_ids(**filters))]
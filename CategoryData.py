@@ -1,9 +1,64 @@
 #!/usr/bin/python3
-import GwentUtils
 
-def create_category_json(gwent_data_helper):
+"""
+Card categories as 128 bit masks. Bit N is set when the card has card_category_N. On the cards, categoryMask holds the
+mask as 32 hex digits, since json numbers can't hold 128 bits.
+    card_masks = get_card_masks(cards)
+    find_with_all(card_masks, ["card_category_3", "card_category_70"])
+"""
+CATEGORY_PREFIX = "card_category_"
+
+
+def get_template_mask(masks):
+    # The (e0, e1) masks from a template. e1 holds categories 64-127.
+    return masks[0] | (masks[1] << 64)
+
+
+def get_category_ids(mask):
+    # The category ids of the set bits, lowest first.
+    category_ids = []
+    while mask:
+        bit = mask & -mask
+        category_ids.append(CATEGORY_PREFIX + str(bit.bit_length() - 1))
+        mask ^= bit
+    return category_ids
+
+
+def get_mask(category_ids):
+    mask = 0
+    for category_id in category_ids:
+        mask |= 1 << int(category_id.replace(CATEGORY_PREFIX, ""))
+    return mask
+
+
+def format_mask(mask):
+    return "%032x" % mask
+
+
+def get_card_masks(cards):
+    # Card id -> category mask, for the queries below. Build it once and reuse it.
+    return {card_id: int(cards[card_id]['categoryMask'], 16) for card_id in cards}
+
+
+def find_with_all(card_masks, category_ids):
+    # Ids of the cards that have every one of the categories.
+    mask = get_mask(category_ids)
+    return [card_id for card_id, card_mask in card_masks.items() if card_mask & mask == mask]
+
+
+def find_with_any(card_masks, category_ids):
+    # Ids of the cards that have at least one of the categories.
+    mask = get_mask(category_ids)
+    return [card_id for card_id, card_mask in card_masks.items() if card_mask & mask]
+
+
+def create_category_json(gwent_data_helper, locales=None):
+    # Defaults to every locale the helper read.
+    if locales is None:
+        locales = gwent_data_helper.locales
+
     categories = {}
-    for locale in GwentUtils.LOCALES:
+    for locale in locales:
         categoriesByLocale = gwent_data_helper.categories[locale]
         for category_id in categoriesByLocale:
             text = categoriesByLocale[category_id]
@@ -0,0 +1,230 @@
+#!/usr/bin/python3
+import argparse
+import json
+import sys
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import CardData
+import GwentUtils
+
+"""
+Deck building rules.
+"""
+BASE_PROVISION_LIMIT = 150
+# Leaders can't be added to a deck at all, which is reported as notCollectible instead.
+MAX_COPIES = {"Leader": 1, "Bronze": 2, "Silver": 1, "Gold": 1}
+
+"""
+Reasons a deck can be invalid.
+"""
+UNKNOWN_CARD = "unknownCard"
+INVALID_LEADER = "invalidLeader"
+NOT_COLLECTIBLE = "notCollectible"
+WRONG_FACTION = "wrongFaction"
+TOO_MANY_COPIES = "tooManyCopies"
+OVER_PROVISION_LIMIT = "overProvisionLimit"
+
+FACTIONS = sorted(CardData.FACTIONS.values())
+
+# The provision, craft and mill cost of a card are packed into one int, so a deck's totals take a single sum. Each
+# field gets enough bits to hold the total of any deck.
+CRAFT_SHIFT = 21
+MILL_SHIFT = 42
+FIELD_MASK = (1 << 21) - 1
+
+# Decks sent to each worker process at a time.
+CHUNK_SIZE = 10000
+
+
+def _is_collectible(card):
+    return any(variation.get('collectible') for variation in card['variations'].values())
+
+
+def _get_variation_value(card, field):
+    # The standard craft or mill cost of the card.
+    for variation in card['variations'].values():
+        values = variation.get(field)
+        if values is not None:
+            return values['standard']
+    return 0
+
+
+class DeckEvaluator:
+    """
+    Scores decks against the cards from CardData.create_card_json. Every card is given an index into flat lookup
+    arrays when the evaluator is created, so scoring a deck is a few passes over small integer lists.
+        evaluator = DeckEvaluator(cards)
+        evaluator.evaluate("200165", ["122101", "122101", "132302"])
+    """
+    def __init__(self, cards):
+        card_ids = sorted(cards)
+        self._indexes = {card_id: index for index, card_id in enumerate(card_ids)}
+        # Unknown card ids are given the last index, which fails every check.
+        self._unknown = len(card_ids)
+        self._card_ids = card_ids + [None]
+
+        # Plain lists, since reading an array creates a new int every time.
+        self._costs = [(cards[card_id].get('provision') or 0)
+                       + (_get_variation_value(cards[card_id], 'craft') << CRAFT_SHIFT)
+                       + (_get_variation_value(cards[card_id], 'mill') << MILL_SHIFT) for card_id in card_ids] + [0]
+        self._provision_boosts = [cards[card_id].get('provisionBoost') or 0 for card_id in card_ids] + [0]
+        # Unknown cards are only reported as unknown.
+        self._max_copies = [MAX_COPIES.get(cards[card_id].get('type'), 0) for card_id in card_ids] + [255]
+        self._is_leader = bytes([cards[card_id].get('type') == "Leader" for card_id in card_ids] + [0])
+        self._collectible = bytes([_is_collectible(cards[card_id]) for card_id in card_ids] + [0])
+        self._factions = bytes([FACTIONS.index(cards[card_id]['faction']) if cards[card_id].get('faction') in FACTIONS
+                                else 255 for card_id in card_ids] + [255])
+        # The faction of each card that can lead a deck, 255 for the rest.
+        self._leader_factions = bytes([self._factions[index] if self._is_leader[index] and self._collectible[index]
+                                       else 255 for index in range(len(self._card_ids))])
+
+        # For each leader faction, whether each card can go in the deck at all: collectible, not a leader, and
+        # either neutral or from the leader's faction. Lets valid decks skip the checks below.
+        neutral = FACTIONS.index("Neutral")
+        self._playable = []
+        for faction in range(len(FACTIONS)):
+            self._playable.append(bytes([
+                self._collectible[index] and not self._is_leader[index] and self._factions[index] in (faction, neutral)
+                for index in range(len(self._card_ids))]))
+
+    def evaluate(self, leader_id, card_ids):
+        # Returns the deck's provision total and limit, craft and mill cost, and whether it's valid with a sorted list
+        # of the reasons it isn't.
+        try:
+            indexes = list(map(self._indexes.__getitem__, card_ids))
+        except KeyError:
+            get_index = self._indexes.get
+            indexes = [get_index(card_id, self._unknown) for card_id in card_ids]
+        leader = self._indexes.get(leader_id, self._unknown)
+
+        costs = sum(map(self._costs.__getitem__, indexes))
+        provision = costs & FIELD_MASK
+        provision_limit = BASE_PROVISION_LIMIT + self._provision_boosts[leader]
+
+        errors = set()
+        faction = self._leader_factions[leader]
+        if faction == 255:
+            errors.add(INVALID_LEADER)
+            faction = None
+
+        if faction is None or not all(map(self._playable[faction].__getitem__, indexes)):
+            self._add_card_errors(errors, faction, indexes)
+
+        if len(set(indexes)) < len(indexes):
+            counts = Counter(indexes)
+            if any(map(int.__gt__, counts.values(), map(self._max_copies.__getitem__, counts))):
+                errors.add(TOO_MANY_COPIES)
+
+        if provision > provision_limit:
+            errors.add(OVER_PROVISION_LIMIT)
+
+        return {
+            "provision": provision,
+            "provisionLimit": provision_limit,
+            "craft": (costs >> CRAFT_SHIFT) & FIELD_MASK,
+            "mill": costs >> MILL_SHIFT,
+            "valid": not errors,
+            "errors": sorted(errors)
+        }
+
+    def _add_card_errors(self, errors, faction, indexes):
+        neutral = FACTIONS.index("Neutral")
+        for index in indexes:
+            if index == self._unknown:
+                errors.add(UNKNOWN_CARD)
+                continue
+            if not self._collectible[index] or self._is_leader[index]:
+                errors.add(NOT_COLLECTIBLE)
+            if faction is not None and self._factions[index] not in (faction, neutral):
+                errors.add(WRONG_FACTION)
+
+    def evaluate_batch(self, decks, jobs=1):
+        # decks is an iterable of {"leader": leader id, "cards": [card ids]}. Returns one result per deck, in order.
+        # With jobs > 1 the decks are split over a process pool, each process with its own copy of the evaluator.
+        if jobs > 1:
+            results = []
+            for _, chunk_results in _map_chunks(self, decks, jobs):
+                results += chunk_results
+            return results
+        evaluate = self.evaluate
+        return [evaluate(deck['leader'], deck['cards']) for deck in decks]
+
+
+# Evaluator shared with every worker in the process pool. Set once per worker process by _init_worker.
+_worker_evaluator = None
+
+
+def _init_worker(evaluator):
+    global _worker_evaluator
+    _worker_evaluator = evaluator
+
+
+def _evaluate_in_worker(decks):
+    return _worker_evaluator.evaluate_batch(decks)
+
+
+def _iter_chunks(decks):
+    decks = iter(decks)
+    return iter(lambda: list(islice(decks, CHUNK_SIZE)), [])
+
+
+def _map_chunks(evaluator, decks, jobs):
+    # Yields each chunk of CHUNK_SIZE decks with its results, in order. Only a couple of chunks per process are read
+    # ahead, so any number of decks can be streamed through the one pool.
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker, initargs=(evaluator,)) as executor:
+        for chunk in _iter_chunks(decks):
+            pending.append((chunk, executor.submit(_evaluate_in_worker, chunk)))
+            if len(pending) > 2 * jobs:
+                chunk, future = pending.popleft()
+                yield chunk, future.result()
+        while pending:
+            chunk, future = pending.popleft()
+            yield chunk, future.result()
+
+
+def _read_decks(filepath):
+    # Either a json list of decks, or one deck per line.
+    with open(filepath, "r", encoding="utf-8") as f:
+        first = f.read(1)
+        while first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            yield from json.load(f)
+            return
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Score a batch of decks: provision, craft and mill cost, and validity.")
+    parser.add_argument("cards", help="Cards json file saved by gwent.py.")
+    parser.add_argument("decks", help="Decks to score, as a json list or one json object per line. Each deck is "
+                                      "{\"leader\": leader id, \"cards\": [card ids]}, plus an optional \"id\".")
+    parser.add_argument("-o", "--output", help="File to save the results to, one json object per line. Defaults to stdout.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of processes used to score the decks. Defaults to 1.")
+    args = parser.parse_args()
+
+    evaluator = DeckEvaluator(GwentUtils.load_json(args.cards))
+
+    output = open(args.output, "w", encoding="utf-8", newline="\n") if args.output else sys.stdout
+    count = 0
+    decks = _read_decks(args.decks)
+    if args.jobs > 1:
+        # One pool for the whole run, so the evaluator is only sent to each process once.
+        batches = _map_chunks(evaluator, decks, args.jobs)
+    else:
+        batches = ((chunk, evaluator.evaluate_batch(chunk)) for chunk in _iter_chunks(decks))
+    for chunk, results in batches:
+        for deck, result in zip(chunk, results):
+            if "id" in deck:
+                result['id'] = deck['id']
+            output.write(json.dumps(result, sort_keys=True, separators=(',', ':')) + "\n")
+            count += 1
+    if args.output:
+        output.close()
+        print("Scored %d decks. Saved results to: %s" % (count, args.output))
@@ -0,0 +1,90 @@
+#!/usr/bin/python3
+
+"""
+A card diff has 2 parts:
+  "set": the fields that were added or changed. Dictionaries that exist in both cards (e.g. 'info' or 'variations')
+         only contain the keys that changed. Everything else (lists, strings, numbers) is the new value.
+  "unset": paths of the fields that no longer exist e.g. [["info", "de-DE"], ["armor"]].
+"""
+
+
+def _diff_dict(old, new, path, unset):
+    changes = {}
+    for key in new:
+        if key not in old:
+            changes[key] = new[key]
+        elif old[key] != new[key]:
+            if isinstance(old[key], dict) and isinstance(new[key], dict):
+                changes[key] = _diff_dict(old[key], new[key], path + [key], unset)
+            else:
+                changes[key] = new[key]
+
+    for key in old:
+        if key not in new:
+            unset.append(path + [key])
+
+    return changes
+
+
+def diff_card(old_card, new_card):
+    # Returns None if the cards are the same.
+    if old_card == new_card:
+        return None
+
+    unset = []
+    diff = {"set": _diff_dict(old_card, new_card, [], unset)}
+    if unset:
+        diff["unset"] = unset
+    return diff
+
+
+def _apply_set(data, changes):
+    for key in changes:
+        if isinstance(data.get(key), dict) and isinstance(changes[key], dict):
+            # Copy before updating. Cards share some dictionaries e.g. the craft and mill values.
+            data[key] = _apply_set(dict(data[key]), changes[key])
+        else:
+            data[key] = changes[key]
+    return data
+
+
+def apply_card_diff(card, diff):
+    # Updates the card in place.
+    _apply_set(card, diff.get("set", {}))
+    for path in diff.get("unset", []):
+        data = card
+        for key in path[:-1]:
+            data[key] = dict(data[key])
+            data = data[key]
+        del data[path[-1]]
+    return card
+
+
+def create_diff_json(old_cards, new_cards):
+    added = {}
+    removed = []
+    changed = {}
+
+    for card_id in new_cards:
+        if card_id not in old_cards:
+            added[card_id] = new_cards[card_id]
+        else:
+            diff = diff_card(old_cards[card_id], new_cards[card_id])
+            if diff is not None:
+                changed[card_id] = diff
+
+    for card_id in old_cards:
+        if card_id not in new_cards:
+            removed.append(card_id)
+
+    return {"added": added, "removed": sorted(removed), "changed": changed}
+
+
+def apply_diff_json(cards, diff_json):
+    # Updates the cards in place, turning the old cards into the new ones.
+    for card_id in diff_json["removed"]:
+        del cards[card_id]
+    for card_id in diff_json["changed"]:
+        apply_card_diff(cards[card_id], diff_json["changed"][card_id])
+    cards.update(diff_json["added"])
+    return cards
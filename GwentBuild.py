@@ -0,0 +1,81 @@
+#!/usr/bin/python3
+
+"""
+Builds the keywords, categories and cards in process, for programs that use the data directly instead of running
+gwent.py and loading the json files it saved. Errors are raised instead of exiting.
+    import GwentBuild
+    data = GwentBuild.build("data_definitions.zip", ["en-US"], ["cards"], patch="v8.0.0")
+    data["cards"]["122101"]
+The other modules are only imported by build, so importing this module is cheap.
+"""
+# The json files gwent.py can save, and the structures build can return.
+OUTPUTS = ["keywords", "categories", "cards"]
+
+DEFAULT_IMAGE_URL = "https://firebasestorage.googleapis.com/v0/b/gwent-9e62a.appspot.com/o/images%2F{patch}%2F{cardId}%2F{variationId}%2F{size}.png?alt=media"
+
+
+def check_locales(locales):
+    import GwentUtils
+    for locale in locales:
+        if locale not in GwentUtils.LOCALISATION_FILE_NAMES:
+            raise ValueError("Unknown language " + locale + ". Choose from: " + ", ".join(GwentUtils.LOCALES))
+
+
+def check_outputs(outputs):
+    for output in outputs:
+        if output not in OUTPUTS:
+            raise ValueError("Unknown output " + output + ". Choose from: " + ", ".join(OUTPUTS))
+
+
+def get_image_url(patch, base_image_url=None):
+    # The base image url, DEFAULT_IMAGE_URL if there isn't one. Raises ValueError if it needs a patch that isn't given.
+    if not base_image_url:
+        if not patch:
+            raise ValueError("Error: If you are not supplying an image url, you need to specify the patch name using --patch.\n"
+                             "This is because the default image url uses the patch name to generate the image url.\n"
+                             "See README for more info.")
+        return DEFAULT_IMAGE_URL
+    if "{patch}" in base_image_url and not patch:
+        raise ValueError("Your image url contains {patch} but you have not supplied a patch name using -p. See README for more info")
+    return base_image_url
+
+
+def build(input_path, locales=None, outputs=None, patch=None, base_image_url=None, jobs=1, cache_folder=None,
+          cache_size=None, url_template=False):
+    # Returns {output: structure} for each of outputs, the same as the json files gwent.py saves. With url_template,
+    # the cards don't have their image urls, like --art-urls template, and the image url template is returned next to
+    # them as "imageUrlTemplate", never inside the cards.
+    # Defaults to every locale and output. input_path is a data_definitions folder or zip.
+    # Raises ValueError for invalid options and FileNotFoundError for missing input files.
+    import CardData
+    import CategoryData
+    import GwentUtils
+    import InputFiles
+    import KeywordData
+    import ParseCache
+
+    locales = list(locales or GwentUtils.LOCALES)
+    outputs = list(outputs or OUTPUTS)
+    check_locales(locales)
+    check_outputs(outputs)
+    base_image_url = get_image_url(patch, base_image_url)
+
+    raw_folder = InputFiles.get_input_folder(input_path)
+    if raw_folder is None:
+        raise FileNotFoundError(input_path + " is not a valid directory or data_definitions zip")
+
+    cache = None
+    if cache_folder:
+        cache = ParseCache.ParseCache(cache_folder, cache_size or ParseCache.DEFAULT_MAX_SIZE_MB)
+    helper = GwentUtils.GwentDataHelper(raw_folder, jobs, cache, locales)
+
+    data = {}
+    if "keywords" in outputs:
+        data["keywords"] = KeywordData.create_keyword_json(helper, locales)
+    if "categories" in outputs:
+        data["categories"] = CategoryData.create_category_json(helper, locales)
+    if "cards" in outputs:
+        data["cards"] = CardData.create_card_json(helper, patch, base_image_url, locales, url_template)
+        if url_template:
+            data["imageUrlTemplate"] = CardData.get_image_url_template(patch, base_image_url)
+    return data
@@ -1,10 +1,19 @@
 #!/usr/bin/python3
+import gzip
+import io
 import json
 import re
 import os
 
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+
 import xml.etree.ElementTree as xml
-from pprint import pprint
+import InputFiles
+import ParseCache
+import Profiler
+import TokenGraph
 
 LOCALES = ["en-US", "de-DE", "es-ES", "es-MX", "fr-FR", "it-IT", "ja-JP", "ko-KR", "pl-PL", "pt-BR", "ru-RU", "zh-CN", "zh-TW"]
 LOCALISATION_FILE_NAMES = {
@@ -22,11 +31,102 @@ LOCALISATION_FILE_NAMES = {
     "zh-CN": "Localization/zh-cn.csv",
     "zh-TW": "Localization/zh-tw.csv"
 }
-
-def save_json(filepath, data):
+# The cards always have their category names in this locale.
+CATEGORY_NAMES_LOCALE = "en-US"
+
+"""
+Compact records extracted from the xml files. Only the values the scripts use are kept, as the text found in the xml.
+The category masks are (e0, e1) tuples of ints.
+"""
+CardTemplate = namedtuple("CardTemplate", ["id", "availability", "art_id", "power", "tier", "type", "faction_id",
+                                           "secondary_faction_id", "provision", "max_range", "player_side",
+                                           "opponent_side", "primary_category", "categories", "rarity", "armor"])
+# Variables are (name, value) tuples, in the order they appear in the xml.
+CardAbility = namedtuple("CardAbility", ["persistent_variables", "temporary_variables", "token_ids"])
+
+OUTPUT_FORMATS = ["pretty", "minified", "ndjson"]
+
+
+def _open_output(filepath, compress):
+    if compress:
+        # mtime=0 keeps the gzip header, and so the file, the same between runs.
+        return io.TextIOWrapper(gzip.GzipFile(filepath, "wb", mtime=0), encoding="utf-8", newline="\n")
+    return open(filepath, "w", encoding="utf-8", newline="\n")
+
+
+def iter_entries(data):
+    # data is either a dictionary or an iterable of (key, value) pairs sorted by key e.g. CardData.iter_card_json.
+    # Returns the (key, value) pairs sorted by key either way. The outputs that save cards all take both.
+    if isinstance(data, dict):
+        return ((key, data[key]) for key in sorted(data))
+    return data
+
+
+def save_json(filepath, data, output_format="pretty", compress=False):
+    # data is anything iter_entries takes. Entries are written one at a time, so the pairs never have to be held in
+    # memory at once.
+    #   pretty: the same as json.dump with indent=2 and sorted keys.
+    #   minified: no whitespace.
+    #   ndjson: one {key: value} object per line.
+    # Returns the number of entries saved.
+    entries = iter_entries(data)
+
+    # Write next to the final location and move it into place at the end, so an error while the entries are created
+    # never leaves a half written file behind.
+    temp_path = filepath + ".tmp"
+    try:
+        with _open_output(temp_path, compress) as f:
+            count = _write_entries(f, entries, output_format)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, filepath)
+
+    Profiler.file_written(filepath)
     print("Saved JSON to: %s" % filepath)
-    with open(filepath, "w", encoding="utf-8", newline="\n") as f:
-        json.dump(data, f, sort_keys=True, indent=2, separators=(',', ': '))
+    return count
+
+
+def _write_entries(f, entries, output_format):
+    count = 0
+    if output_format == "ndjson":
+        for key, value in entries:
+            f.write(json.dumps({key: value}, sort_keys=True, separators=(',', ':')))
+            f.write("\n")
+            count += 1
+    elif output_format == "minified":
+        f.write("{")
+        for key, value in entries:
+            if count:
+                f.write(",")
+            f.write(json.dumps(key) + ":" + json.dumps(value, sort_keys=True, separators=(',', ':')))
+            count += 1
+        f.write("}")
+    else:
+        f.write("{")
+        for key, value in entries:
+            f.write(",\n  " if count else "\n  ")
+            value_json = json.dumps(value, sort_keys=True, indent=2, separators=(',', ': '))
+            # JSON strings can't contain new lines, so every new line is indentation.
+            f.write(json.dumps(key) + ": " + value_json.replace("\n", "\n  "))
+            count += 1
+        f.write("\n}" if count else "}")
+    return count
+
+
+def load_json(filepath):
+    # Loads a file saved by save_json in any format: gzipped if it ends with .gz, and one entry per line if it's
+    # .ndjson or .ndjson.gz.
+    opener = gzip.open if filepath.endswith(".gz") else open
+    with opener(filepath, "rt", encoding="utf-8") as f:
+        if not filepath.endswith((".ndjson", ".ndjson.gz")):
+            return json.load(f)
+        data = {}
+        for line in f:
+            if line.strip():
+                data.update(json.loads(line))
+        return data
 
 
 def clean_html(raw_html):
@@ -47,87 +147,92 @@ def _is_token_valid(token, tooltips):
         return False
 
 
-def _get_evaluated_tooltips(raw_tooltips, card_names, card_abilities, card_templates):
-    # Generate complete tooltips from the raw_tooltips and accompanying data.
+# Matches every placeholder in a tooltip. E.g. 'Damage' in '{Damage}'.
+PLACEHOLDER_REGEX = re.compile(r'\{(.*?)\}')
+
+
+def _get_placeholder_values(card_templates, card_abilities):
+    # Build the values each card's placeholders resolve to once, so they can be shared by every locale.
+    placeholder_values = {}
+    for card_id in card_templates:
+        template = card_templates[card_id]
+        values = {}
+        ability = card_abilities.get(card_id)
+        if ability is not None:
+            # Ability placeholders are case insensitive. The first variable with a name wins, checking the
+            # persistent variables before the temporary ones.
+            for variables in [ability.persistent_variables, ability.temporary_variables]:
+                for name, value in variables:
+                    values.setdefault(name.lower(), value)
+
+        values["Card.MaxRange"] = template.max_range
+        values["Template.Provision"] = template.provision
+        placeholder_values[card_id] = values
+    return placeholder_values
+
+
+def _get_placeholder_value(values, match):
+    key = match.group(1)
+    if key in values:
+        value = values[key]
+    else:
+        # Remember the result under the placeholder as written, so the other locales don't have to lowercase it again.
+        value = values.get(key.lower())
+        values[key] = value
+
+    # Leave any placeholder we can't resolve as it is.
+    if value is None:
+        return match.group(0)
+    return value
+
+
+def _get_evaluated_tooltips(raw_tooltips, placeholder_values):
+    # Generate complete tooltips from the raw_tooltips and the values from _get_placeholder_values.
     tooltips = {}
     for card_id in raw_tooltips:
+        tooltip = raw_tooltips[card_id]
 
         # Some cards don't have info.
-        if raw_tooltips.get(card_id) is None or raw_tooltips.get(card_id) == "":
+        if tooltip is None or tooltip == "":
             tooltips[card_id] = ""
             continue
 
-        # Set tooltip to be the raw tooltip string.
-        tooltips[card_id] = raw_tooltips[card_id]
-
-        template = card_templates[card_id]
-        # First replace the MaxRange placeholder
-        result = re.findall(r'.*?(\{Card\.MaxRange\}).*?', tooltips[card_id])
-        for key in result:
-            value = template.find('MaxRange').text
-            tooltips[card_id] = tooltips[card_id].replace(key, value)
-
-        # Replace provision cost placeholder
-        result = re.findall(r'.*?(\{Template\.Provision\}).*?', tooltips[card_id])
-        for key in result:
-            value = template.find('Provision').text
-            tooltips[card_id] = tooltips[card_id].replace(key, value)
+        values = placeholder_values[card_id]
 
         # https://github.com/GwentCommunityDevelopers/gwent-data/issues/38
-        tooltips[card_id] = tooltips[card_id].replace("-B.P.BB_Hoard", "")
-        tooltips[card_id] = tooltips[card_id].replace("Tribute-B.P.BB_Tribute", "Tribute")
-
-        # Now replace all the other card abilities.
-        # Regex. Get all strings that lie between a '{' and '}'.
-        result = re.findall(r'.*?\{(.*?)\}.*?', tooltips[card_id])
-        for key in result:
-            ability_value = _get_card_ability_value(card_abilities, card_id, key)
-            if ability_value is not None:
-                tooltips[card_id] = tooltips[card_id].replace("{" + key + "}", ability_value)
+        if "BB_" in tooltip:
+            tooltip = tooltip.replace("-B.P.BB_Hoard", "")
+            tooltip = tooltip.replace("Tribute-B.P.BB_Tribute", "Tribute")
 
-    return tooltips
+        # Replace {Card.MaxRange}, {Template.Provision} and all the card ability placeholders in a single pass.
+        if "{" in tooltip:
+            tooltip = PLACEHOLDER_REGEX.sub(lambda match: _get_placeholder_value(values, match), tooltip)
 
-def _get_card_ability_value(card_abilities, card_id, key):
-    ability = card_abilities.get(card_id)
-    if ability is None:
-        return None
+        tooltips[card_id] = tooltip
 
-    lower_case_key = key.lower()
-    ability_data = ability.find('PersistentVariables')
-    if ability_data is not None:
-        for value in ability_data:
-            if value.attrib['Name'].lower() == lower_case_key:
-                return value.attrib['V']
+    return tooltips
 
-    ability_data = ability.find('TemporaryVariables')
-    if ability_data is not None:
-        for value in ability_data:
-            if value.attrib['Name'].lower() == lower_case_key:
-                return value.attrib['V']
 
 def _get_tokens(card_templates, card_abilities):
     tokens = {}
     for card_id in card_templates:
-        tokens[card_id] = []
         ability = card_abilities.get(card_id)
         if ability is None:
-            continue
-        ability_data = ability.find('TemporaryVariables')
-        if ability_data is not None:
-            for value in ability_data.iter("V"):
-                if value.attrib.get('Type') == "CardDefinition":
-                    token_id = value.attrib['TemplateId']
-                    if token_id not in tokens[card_id]:
-                        tokens[card_id].append(token_id)
-
-                for child in value:
-                    if child.attrib.get('Type') == "CardDefinition":
-                        token_id = child.attrib['TemplateId']
-                        if token_id not in tokens[card_id]:
-                            tokens[card_id].append(token_id)
+            tokens[card_id] = []
+        else:
+            tokens[card_id] = list(ability.token_ids)
     return tokens
 
 
+def _get_armor(card_templates):
+    armor = {}
+    for card_id in card_templates:
+        template = card_templates[card_id]
+        if template.armor != None:
+            armor[card_id] = template.armor
+    return armor
+
+
 def _get_keywords(tooltips):
     keywords_by_tooltip_id = {}
     for tooltip_id in tooltips:
@@ -144,119 +249,377 @@ def _get_keywords(tooltips):
     return keywords_by_tooltip_id
 
 
-class GwentDataHelper:
-    def __init__(self, raw_folder):
-        self._folder = raw_folder
-        self.card_templates = self.get_card_templates()
-        raw_tooltips = {}
-        self.card_names = {}
-        self.flavor_strings = {}
-        self.categories = {}
-        for locale in LOCALES:
-            raw_tooltips[locale] = self.get_card_tooltips(locale)
-            self.card_names[locale] = self.get_card_names(locale)
-            self.flavor_strings[locale] = self.get_flavor_strings(locale)
-            self.categories[locale] = self.get_categories(locale)
-        card_abilities = self.get_card_abilities()
-
-        self.tooltips = {}
-        for locale in LOCALES:
-            self.tooltips[locale] = _get_evaluated_tooltips(raw_tooltips[locale], self.card_names[locale], card_abilities, self.card_templates)
+def _iterparse(path, tag):
+    # Stream every element with the given tag. Each element is cleared once the caller is done with it, so the
+    # whole tree is never held in memory.
+    Profiler.file_read(path)
+    with InputFiles.open_binary(path) as f:
+        context = xml.iterparse(f, events=("start", "end"))
+        _, root = next(context)
+        for event, element in context:
+            if event == "end" and element.tag == tag:
+                yield element
+                element.clear()
+                root.clear()
+
+
+def _get_category_masks(node):
+    return (int(node.find('e0').attrib['V']), int(node.find('e1').attrib['V']))
+
+
+def _get_template_record(template):
+    secondary_faction = template.find('SecondaryFactionId')
+    placement = template.find('Placement')
+    armor = template.find('Armor')
+    return CardTemplate(
+        id=template.attrib['Id'],
+        availability=template.attrib['Availability'],
+        art_id=template.attrib.get('ArtId'),
+        power=template.find('Power').text,
+        tier=template.find('Tier').text,
+        type=template.find('Type').text,
+        faction_id=template.find('FactionId').text,
+        secondary_faction_id=secondary_faction.text if secondary_faction is not None else None,
+        provision=template.find('Provision').text,
+        max_range=template.find('MaxRange').text,
+        player_side=placement.attrib['PlayerSide'],
+        opponent_side=placement.attrib['OpponentSide'],
+        primary_category=_get_category_masks(template.find('PrimaryCategory')),
+        categories=_get_category_masks(template.find('Categories')),
+        rarity=template.find('Rarity').text,
+        armor=armor.text if armor is not None else None)
+
+
+def _get_variables(ability_data):
+    if ability_data is None:
+        return ()
+    return tuple((value.attrib['Name'], value.attrib.get('V')) for value in ability_data if 'Name' in value.attrib)
+
+
+def _get_token_ids(ability_data):
+    # Dictionary keys keep the order the tokens were found in, without checking a list for duplicates.
+    token_ids = {}
+    if ability_data is not None:
+        for value in ability_data.iter("V"):
+            if value.attrib.get('Type') == "CardDefinition":
+                token_ids[value.attrib['TemplateId']] = None
 
-        # Can use any locale here, all locales will return the same result.
-        self.keywords = _get_keywords(self.tooltips[LOCALES[0]])
+            for child in value:
+                if child.attrib.get('Type') == "CardDefinition":
+                    token_ids[child.attrib['TemplateId']] = None
+    return tuple(token_ids)
 
-        self.tokens = _get_tokens(self.card_templates, card_abilities)
 
-        self.artists = self.get_artists()
+def _get_ability_record(ability):
+    temporary_variables = ability.find('TemporaryVariables')
+    return CardAbility(
+        persistent_variables=_get_variables(ability.find('PersistentVariables')),
+        temporary_variables=_get_variables(temporary_variables),
+        token_ids=_get_token_ids(temporary_variables))
 
-        self.armor = self.get_card_armor()
 
-    def get_tooltips_file(self, locale):
-        path = self._folder + LOCALISATION_FILE_NAMES[locale]
-        if not os.path.isfile(path):
-            print("Couldn't find " + locale + " tooltips at " + path)
-            exit()
-        return path
-
-    def get_card_tooltips(self, locale):
-        tooltips_file = open(self.get_tooltips_file(locale), "r", encoding="utf-8")
-        tooltips = {}
-        for line in tooltips_file:
+def _read_localisation_strings(path):
+    # Read the localisation file once, sorting every line into each of the tables it belongs to.
+    tooltips = {}
+    keywords = {}
+    categories = {}
+    card_names = {}
+    flavor_strings = {}
+    with InputFiles.open_text(path) as localisation_file:
+        for line in localisation_file:
             split = line.split(";", 1)
-            if "tooltip" not in split[0]:
+            if len(split) < 2:
                 continue
-            tooltip_id = split[0].replace("_tooltip", "").replace("\"", "").lstrip("0")
+            key = split[0]
+            text = split[1]
 
-            # Remove any weird tooltip ids e.g. 64_tooltip_lt
-            if "_lt" in tooltip_id or "_sa" in tooltip_id or "_b" in tooltip_id or "card_in_maintenance" in tooltip_id:
-                continue
+            if "tooltip" in key:
+                tooltip_id = key.replace("_tooltip", "").replace("\"", "").lstrip("0")
+                # Remove any weird tooltip ids e.g. 64_tooltip_lt
+                if not ("_lt" in tooltip_id or "_sa" in tooltip_id or "_b" in tooltip_id or "card_in_maintenance" in tooltip_id):
+                    # Remove any quotation marks and new lines.
+                    tooltips[tooltip_id] = text.replace("\"\n", "").replace("\\n", "\n")
 
-            # Remove any quotation marks and new lines.
-            tooltips[tooltip_id] = split[1].replace("\"\n", "").replace("\\n", "\n")
-        tooltips_file.close()
-        return tooltips
+            if "keyword" in key:
+                keyword_id = key.replace("keyword_", "").replace("\"", "")
+                keywords[keyword_id] = text.replace("\"", "").replace("\n", "")
 
-    def get_keyword_tooltips(self, locale):
-        tooltips_file = open(self.get_tooltips_file(locale), "r", encoding="utf-8")
-        keywords = {}
-        for tooltip in tooltips_file:
-            split = tooltip.split(";", 1)
-            if "keyword" not in split[0]:
-                continue
-            keyword_id = split[0].replace("keyword_", "").replace("\"", "")
+            if "category" in key:
+                categories[key] = text.replace("\"", "").replace("\n", "")
 
-            keywords[keyword_id] = {}
-            # Remove any quotation marks and new lines.
-            keywords[keyword_id] = split[1].replace("\"", "").replace("\n", "")
+            if "_name" in key:
+                name_id = key.replace("_name", "").replace("\"", "")
+                card_names[name_id] = text.replace("\"", "").replace("\n", "")
 
-        tooltips_file.close()
-        return keywords
+            if "_fluff" in key:
+                flavor_id = key.replace("_fluff", "").replace("\"", "")
+                flavor_strings[flavor_id] = text.replace("\"", "").replace("\n", "")
 
-    def get_categories(self, locale):
-        tooltips_file = open(self.get_tooltips_file(locale), "r", encoding="utf-8")
-        categories = {}
-        for line in tooltips_file:
-            split = line.split(";", 1)
-            if "category" not in split[0]:
-                continue
-            category_id = split[0]
+    return {
+        "tooltips": tooltips,
+        "keywords": keywords,
+        "categories": categories,
+        "names": card_names,
+        "flavor": flavor_strings
+    }
 
-            categories[category_id] = {}
-            # Remove any quotation marks and new lines.
-            categories[category_id] = split[1].replace("\"", "").replace("\n", "")
 
-        tooltips_file.close()
-        return categories
+# Placeholder values shared with every locale worker in the process pool. Set once per worker process by
+# _init_locale_worker.
+_worker_placeholder_values = None
 
-    def get_card_templates(self):
-        path = self._folder + "Templates.xml"
-        if not os.path.isfile(path):
-            print("Couldn't find templates.xml at " + path)
-            exit()
 
-        card_templates = {}
+def _init_locale_worker(placeholder_values):
+    global _worker_placeholder_values
+    _worker_placeholder_values = placeholder_values
+
+
+def _evaluate_tooltips_in_worker(raw_tooltips):
+    # Only the locale's raw tooltips are sent to the worker, and only the evaluated tooltips are sent back.
+    return _get_evaluated_tooltips(raw_tooltips, _worker_placeholder_values)
+
+
+# The tables read from each data file, and the tables computed from each table. When a file changes, every table that
+# depends on it is forgotten and computed again the next time it is used. See GwentDataHelper.file_changed.
+DATA_FILE_TABLES = {
+    "Templates.xml": ["card_templates"],
+    "Abilities.xml": ["card_abilities"],
+    "ArtDefinitions.xml": ["artists"]
+}
+DEPENDENT_TABLES = {
+    "card_templates": ["tokens", "armor", "placeholder_values"],
+    "card_abilities": ["tokens", "placeholder_values"],
+    "tokens": ["token_graph"],
+    "placeholder_values": ["tooltips"],
+    "tooltips": ["keywords"]
+}
+# Tables with one entry per locale, rebuilt from the strings of each locale.
+STRING_TABLES = ["card_names", "flavor_strings", "categories", "category_names", "keyword_tooltips"]
+
+
+class GwentDataHelper:
+    # Every table is only read or computed the first time it is used, and then kept. E.g. create_category_json only
+    # reads the localisation files, never the xml files.
+    def __init__(self, raw_folder, jobs=1, cache=None, locales=None):
+        self._folder = raw_folder
+        self._jobs = jobs
+        self._cache = cache
+        # The locales to read. Defaults to every locale.
+        self.locales = list(locales or LOCALES)
+        # Strings read from each locale's localisation file, see _read_localisation_strings.
+        self._locale_strings = {}
+        # Cache keys of the files that were already hashed.
+        self._cache_keys = {}
+
+    @cached_property
+    def card_templates(self):
+        return self._load_table("Templates.xml", self.get_card_templates)
+
+    @cached_property
+    def card_abilities(self):
+        return self._load_table("Abilities.xml", self.get_card_abilities)
+
+    @cached_property
+    def artists(self):
+        return self._load_table("ArtDefinitions.xml", self.get_artists)
+
+    @cached_property
+    def tokens(self):
+        card_templates = self.card_templates
+        card_abilities = self.card_abilities
+        with Profiler.stage("tokens"):
+            return _get_tokens(card_templates, card_abilities)
+
+    @cached_property
+    def token_graph(self):
+        # Forward and reverse token edges, see TokenGraph.
+        tokens = self.tokens
+        with Profiler.stage("token graph"):
+            return TokenGraph.TokenGraph(tokens)
+
+    @cached_property
+    def armor(self):
+        return _get_armor(self.card_templates)
+
+    @cached_property
+    def category_names(self):
+        # The card category names in CATEGORY_NAMES_LOCALE, read even if the locale isn't one of the helper's locales.
+        return self._get_locale_strings(CATEGORY_NAMES_LOCALE)["categories"]
+
+    @cached_property
+    def card_names(self):
+        return self._get_strings("names")
+
+    @cached_property
+    def flavor_strings(self):
+        return self._get_strings("flavor")
+
+    @cached_property
+    def categories(self):
+        return self._get_strings("categories")
+
+    @cached_property
+    def keyword_tooltips(self):
+        return self._get_strings("keywords")
+
+    @cached_property
+    def placeholder_values(self):
+        card_templates = self.card_templates
+        card_abilities = self.card_abilities
+        with Profiler.stage("placeholder values"):
+            return _get_placeholder_values(card_templates, card_abilities)
+
+    @cached_property
+    def tooltips(self):
+        placeholder_values = self.placeholder_values
+
+        # Each locale is independent, so they can be spread over a process pool. Results are always merged in
+        # locale order, so the output is the same as a serial run.
+        raw_tooltips = self._get_strings("tooltips")
+        if self._jobs > 1:
+            with Profiler.stage("tooltips (%d locales)" % len(self.locales)):
+                with ProcessPoolExecutor(max_workers=min(self._jobs, len(self.locales)), initializer=_init_locale_worker,
+                                         initargs=(placeholder_values,)) as executor:
+                    results = executor.map(_evaluate_tooltips_in_worker, [raw_tooltips[locale] for locale in self.locales])
+                    return dict(zip(self.locales, results))
 
-        tree = xml.parse(path)
-        root = tree.getroot()
+        tooltips = {}
+        for locale in self.locales:
+            with Profiler.stage("tooltips " + locale):
+                tooltips[locale] = _get_evaluated_tooltips(raw_tooltips[locale], placeholder_values)
+        return tooltips
+
+    @cached_property
+    def keywords(self):
+        # Can use any locale here, all locales will return the same result.
+        return _get_keywords(self.tooltips[self.locales[0]])
+
+    def file_changed(self, file_name):
+        # Forget everything read from file_name e.g. "Abilities.xml" or "Localization/en-us.csv", relative to the
+        # folder, and every table computed from it. When a localisation file changes, only that locale's tooltips are
+        # evaluated again, straight away.
+        path = self._folder + file_name
+        for paths in [paths for paths in self._cache_keys if path in paths]:
+            del self._cache_keys[paths]
+
+        for table in DATA_FILE_TABLES.get(file_name, []):
+            self._forget(table)
+
+        for locale in LOCALISATION_FILE_NAMES:
+            if LOCALISATION_FILE_NAMES[locale] == file_name:
+                self._locale_strings.pop(locale, None)
+                for table in STRING_TABLES:
+                    self.__dict__.pop(table, None)
+                if locale in self.locales and "tooltips" in self.__dict__:
+                    strings = self._get_locale_strings(locale)
+                    with Profiler.stage("tooltips " + locale):
+                        self.tooltips[locale] = _get_evaluated_tooltips(strings["tooltips"], self.placeholder_values)
+                    if locale == self.locales[0]:
+                        self._forget("keywords")
+
+    def _forget(self, table):
+        self.__dict__.pop(table, None)
+        for dependent_table in DEPENDENT_TABLES.get(table, []):
+            self._forget(dependent_table)
+
+    def _load_table(self, file_name, parse):
+        path = self.get_data_file(file_name)
+        key, table = self._load_from_cache([path])
+        if table is None:
+            with Profiler.stage("parse " + file_name):
+                table = parse()
+            self._save_to_cache(key, table)
+        return table
+
+    def _get_known_strings(self, locale):
+        # The locale's strings if they were already read or are in the cache, otherwise None.
+        strings = self._locale_strings.get(locale)
+        if strings is None:
+            _, strings = self._load_from_cache([self.get_tooltips_file(locale)])
+            if strings is not None:
+                self._locale_strings[locale] = strings
+        return strings
+
+    def _add_strings(self, locale, path, strings):
+        self._locale_strings[locale] = strings
+        if self._cache is not None:
+            self._save_to_cache(self._get_cache_key([path]), strings)
+
+    def _get_locale_strings(self, locale):
+        strings = self._get_known_strings(locale)
+        if strings is None:
+            path = self.get_tooltips_file(locale)
+            Profiler.file_read(path)
+            with Profiler.stage("read " + os.path.basename(path)):
+                strings = _read_localisation_strings(path)
+            self._add_strings(locale, path, strings)
+        return strings
+
+    def _get_strings(self, table):
+        missing = [locale for locale in self.locales if self._get_known_strings(locale) is None]
+        paths = [self.get_tooltips_file(locale) for locale in missing]
+        for path in paths:
+            Profiler.file_read(path)
+        if self._jobs > 1 and len(missing) > 1:
+            with Profiler.stage("read %d localisation files" % len(missing)):
+                with ProcessPoolExecutor(max_workers=min(self._jobs, len(missing))) as executor:
+                    results = list(executor.map(_read_localisation_strings, paths))
+        else:
+            results = []
+            for path in paths:
+                with Profiler.stage("read " + os.path.basename(path)):
+                    results.append(_read_localisation_strings(path))
+
+        for locale, path, strings in zip(missing, paths, results):
+            self._add_strings(locale, path, strings)
+
+        return {locale: self._locale_strings[locale][table] for locale in self.locales}
+
+    def _load_from_cache(self, paths):
+        # Returns the cache key for the files and whatever was cached under it.
+        if self._cache is None:
+            return None, None
+        with Profiler.stage("cache " + os.path.basename(paths[0])):
+            key = self._get_cache_key(paths)
+            return key, self._cache.load(key)
+
+    def _get_cache_key(self, paths):
+        key = self._cache_keys.get(tuple(paths))
+        if key is None:
+            key = ParseCache.hash_files(paths)
+            self._cache_keys[tuple(paths)] = key
+        return key
+
+    def _save_to_cache(self, key, data):
+        if self._cache is not None:
+            self._cache.save(key, data)
+
+    def get_data_file(self, file_name):
+        path = self._folder + file_name
+        if not InputFiles.is_file(path):
+            raise FileNotFoundError("Couldn't find " + file_name + " at " + path)
+        return path
+
+    def get_tooltips_file(self, locale):
+        path = self._folder + LOCALISATION_FILE_NAMES[locale]
+        if not InputFiles.is_file(path):
+            raise FileNotFoundError("Couldn't find " + locale + " tooltips at " + path)
+        return path
+
+    def get_card_templates(self):
+        path = self.get_data_file("Templates.xml")
 
-        for template in root.iter('Template'):
-            card_templates[template.attrib['Id']] = template
+        card_templates = {}
+        for template in _iterparse(path, 'Template'):
+            card_templates[template.attrib['Id']] = _get_template_record(template)
 
         return card_templates
 
     def get_artists(self):
-        path = self._folder + "ArtDefinitions.xml"
-        if not os.path.isfile(path):
-            print("Couldn't find ArtDefinitions.xml at " + path)
-            exit()
+        path = self.get_data_file("ArtDefinitions.xml")
 
         artists = {}
-
-        tree = xml.parse(path)
-        root = tree.getroot()
-
-        for art in root.iter('ArtDefinition'):
+        for art in _iterparse(path, 'ArtDefinition'):
             art_id = art.attrib['ArtId']
             artist = art.get('ArtistName')
             if artist != None:
@@ -265,76 +628,12 @@ class GwentDataHelper:
         return artists
 
     def get_card_abilities(self):
-        path = self._folder + "Abilities.xml"
-        if not os.path.isfile(path):
-            print("Couldn't find abilities.xml at " + path)
-            exit()
+        path = self.get_data_file("Abilities.xml")
 
         abilities = {}
-
-        tree = xml.parse(path)
-        root = tree.getroot()
-
-        for ability in root.iter('Ability'):
+        for ability in _iterparse(path, 'Ability'):
             if ability.attrib['Type'] == "CardAbility":
                 card_id = ability.attrib['Template']
-                abilities[card_id] = ability
+                abilities[card_id] = _get_ability_record(ability)
 
         return abilities
-
-    def get_card_armor(self):
-        path = self._folder + "Templates.xml"
-        if not os.path.isfile(path):
-            print("Couldn't find templates.xml at " + path)
-            exit()
-
-        armor = {}
-
-        tree = xml.parse(path)
-        root = tree.getroot()
-
-        for template in root.iter('Template'):
-            armor_element = template.find('Armor')
-
-            if armor_element != None:
-                armor[template.attrib['Id']] = armor_element.text
-
-        return armor
-
-    def get_card_names(self, locale):
-        card_name_file = open(self.get_card_names_file(locale), "r", encoding="utf8")
-        card_names = {}
-        for line in card_name_file:
-            split = line.split(";", 1)
-            if len(split) < 2:
-                continue
-            if "_name" in split[0]:
-                name_id = split[0].replace("_name", "").replace("\"", "")
-                # Remove any quotation marks and new lines.
-                card_names[name_id] = split[1].replace("\"", "").replace("\n", "")
-
-        card_name_file.close()
-        return card_names
-
-    def get_flavor_strings(self, locale):
-        card_name_file = open(self.get_card_names_file(locale), "r", encoding="utf8")
-        flavor_strings = {}
-        for line in card_name_file:
-            split = line.split(";", 1)
-            if len(split) < 2:
-                continue
-            if "_fluff" in split[0]:
-                flavor_id = split[0].replace("_fluff", "").replace("\"", "")
-                # Remove any quotation marks and new lines.
-                flavor_strings[flavor_id] = split[1].replace("\"", "").replace("\n", "")
-
-        card_name_file.close()
-        return flavor_strings
-
-    def get_card_names_file(self, locale):
-        path = self._folder + LOCALISATION_FILE_NAMES[locale]
-        if not os.path.isfile(path):
-            print("Couldn't find " + locale + " card file at " + path)
-            exit()
-
-        return path
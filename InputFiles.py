@@ -0,0 +1,89 @@
+#!/usr/bin/python3
+import io
+import os
+import zipfile
+
+"""
+Input files are either plain files, or files inside a zip archive. Files inside an archive use paths like
+data_definitions.zip!/Templates.xml, so they can be joined, hashed and sent to other processes like any other path.
+Nothing is extracted to disk, each file is streamed from the archive when it is read.
+"""
+ZIP_SEPARATOR = "!/"
+
+
+def _split(path):
+    # (archive path, member name) for files inside an archive, otherwise (path, None).
+    if ZIP_SEPARATOR in path:
+        archive_path, member = path.split(ZIP_SEPARATOR, 1)
+        return archive_path, member
+    return path, None
+
+
+def get_input_folder(path):
+    # The path of the folder with the xml files, ending in a slash, for either a data_definitions folder or zip.
+    # None if path is neither.
+    if os.path.isdir(path):
+        if path[-1] != "/":
+            path = path + "/"
+        return path
+    if os.path.isfile(path) and zipfile.is_zipfile(path):
+        return get_zip_folder(path)
+    return None
+
+
+def get_zip_folder(archive_path):
+    # The folder path of the xml files inside the archive, whether they are at the top of the archive or in a
+    # data_definitions folder. None if the archive doesn't have them.
+    with zipfile.ZipFile(archive_path) as archive:
+        for name in archive.namelist():
+            if name == "Templates.xml" or name.endswith("/Templates.xml"):
+                return archive_path + ZIP_SEPARATOR + name[:-len("Templates.xml")]
+    return None
+
+
+def open_binary(path):
+    archive_path, member = _split(path)
+    if member is None:
+        return open(path, "rb")
+    # The member keeps the archive file open until it is closed itself.
+    with zipfile.ZipFile(archive_path) as archive:
+        return archive.open(member)
+
+
+def open_text(path):
+    return io.TextIOWrapper(open_binary(path), encoding="utf-8")
+
+
+def _get_info(path):
+    archive_path, member = _split(path)
+    try:
+        with zipfile.ZipFile(archive_path) as archive:
+            return archive.getinfo(member)
+    except (OSError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def is_file(path):
+    if ZIP_SEPARATOR not in path:
+        return os.path.isfile(path)
+    return _get_info(path) is not None
+
+
+def get_size(path):
+    if ZIP_SEPARATOR not in path:
+        return os.path.getsize(path)
+    return _get_info(path).file_size
+
+
+def get_state(path):
+    # Changes whenever the file changes. None if the file doesn't exist.
+    if ZIP_SEPARATOR not in path:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+    info = _get_info(path)
+    if info is None:
+        return None
+    return (info.date_time, info.CRC, info.file_size)
@@ -2,10 +2,14 @@
 import GwentUtils
 
 
-def create_keyword_json(gwent_data_helper):
+def create_keyword_json(gwent_data_helper, locales=None):
+    # Defaults to every locale the helper read.
+    if locales is None:
+        locales = gwent_data_helper.locales
+
     keywords = {}
-    for locale in GwentUtils.LOCALES:
-        keywordsByLocale = gwent_data_helper.get_keyword_tooltips(locale)
+    for locale in locales:
+        keywordsByLocale = gwent_data_helper.keyword_tooltips[locale]
         for keyword_id in keywordsByLocale:
             tooltip = keywordsByLocale[keyword_id]
             if keywords.get(keyword_id) is None:
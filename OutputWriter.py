@@ -0,0 +1,157 @@
+#!/usr/bin/python3
+import gzip
+import os
+import queue
+import shutil
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import Profiler
+
+# brotli is optional, it's only needed to save .br files.
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+"""
+Precompressed copies that can be saved next to each output file, e.g. cards.json.gz and cards.json.br, so a CDN can
+serve them without compressing them itself.
+"""
+PRECOMPRESS_FORMATS = ["gz", "br"]
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 11
+
+# Items held between the thread creating them and the thread saving them.
+STREAM_BUFFER_SIZE = 256
+_END = object()
+# Sent instead of _END when creating the items failed.
+_ABORT = object()
+
+
+def compress_file(filepath, compression):
+    # Saves a compressed copy of the file at filepath.gz or filepath.br. Returns the new file's path.
+    compressed_path = filepath + "." + compression
+    with Profiler.stage("compress " + os.path.basename(compressed_path)):
+        if compression == "gz":
+            # mtime=0 keeps the gzip header, and so the file, the same between runs.
+            with open(filepath, "rb") as source, gzip.GzipFile(compressed_path, "wb", GZIP_LEVEL, mtime=0) as target:
+                shutil.copyfileobj(source, target, 1024 * 1024)
+        elif compression == "br":
+            with open(filepath, "rb") as source:
+                data = source.read()
+            with open(compressed_path, "wb") as target:
+                target.write(brotli.compress(data, quality=BROTLI_QUALITY))
+        else:
+            raise ValueError("Unknown compression " + compression)
+    Profiler.file_written(compressed_path)
+    print("Saved compressed copy to: %s" % compressed_path)
+    return compressed_path
+
+
+def _put(buffer, item, future):
+    while True:
+        try:
+            buffer.put(item, timeout=0.1)
+            return
+        except queue.Full:
+            # Stop if the writer failed, instead of waiting for it forever.
+            if future.done():
+                future.result()
+                raise RuntimeError("The writer stopped before all the items were saved")
+
+
+def _iter_queue(items):
+    while True:
+        item = items.get()
+        if item is _END:
+            return
+        if item is _ABORT:
+            # Raised inside the save function, so it can throw away the file it started.
+            raise RuntimeError("Creating the items failed before they were all saved")
+        yield item
+
+
+class OutputWriter:
+    """
+    Saves output files on a pool of writer threads, so the files are written and compressed while the next one is
+    being created. With threads=0, every file is saved before save returns, in the calling thread.
+        writer = OutputWriter(4, ["gz", "br"])
+        writer.save(GwentUtils.save_json, path, keywords)
+        writer.save_stream(GwentUtils.save_json, path, CardData.iter_card_json(...))
+        writer.wait()
+    Everything the save functions are given must not change until wait returns.
+    """
+    def __init__(self, threads=0, precompress=()):
+        self._precompress = list(precompress)
+        if "br" in self._precompress and brotli is None:
+            raise ImportError("Saving .br files needs the brotli package: pip install brotli")
+        self._executor = ThreadPoolExecutor(max_workers=threads) if threads > 0 else None
+        self._futures = []
+        self._lock = threading.Lock()
+
+    def _submit(self, function, *args):
+        if self._executor is None:
+            future = Future()
+            future.set_result(function(*args))
+        else:
+            future = self._executor.submit(function, *args)
+        with self._lock:
+            self._futures.append(future)
+        return future
+
+    def _save_and_compress(self, save, filepath, args, precompress):
+        # Timed here, on the thread doing the saving, since save only queues the file.
+        with Profiler.stage("save " + os.path.basename(filepath)):
+            result = save(filepath, *args)
+        # Every compressed copy is made on its own thread.
+        if precompress:
+            for compression in self._precompress:
+                self._submit(compress_file, filepath, compression)
+        return result
+
+    def save(self, save, filepath, *args, precompress=True):
+        # Calls save(filepath, *args), then saves the compressed copies of the file unless precompress is False.
+        # Returns a future with the result of save.
+        return self._submit(self._save_and_compress, save, filepath, args, precompress)
+
+    def save_stream(self, save, filepath, items, *args, precompress=True):
+        # Like save, with save(filepath, items, *args), but the items are created in this thread while the writer
+        # thread saves them, so creating and saving overlap.
+        if self._executor is None:
+            return self.save(save, filepath, items, *args, precompress=precompress)
+
+        buffer = queue.Queue(STREAM_BUFFER_SIZE)
+        future = self.save(save, filepath, _iter_queue(buffer), *args, precompress=precompress)
+        try:
+            for item in items:
+                _put(buffer, item, future)
+        except BaseException:
+            # Stop the writer thread, which would otherwise wait for the next item forever and keep the process from
+            # exiting. Its own error is expected now, the one raised here is the cause.
+            try:
+                _put(buffer, _ABORT, future)
+                future.exception()
+            except BaseException:
+                pass
+            with self._lock:
+                self._futures.remove(future)
+            raise
+        _put(buffer, _END, future)
+        return future
+
+    def wait(self):
+        # Waits for every file, including the compressed copies, to be saved. Raises the first error.
+        while True:
+            with self._lock:
+                futures = self._futures
+                self._futures = []
+            if not futures:
+                return
+            for future in futures:
+                future.result()
+
+    def close(self):
+        self.wait()
+        if self._executor is not None:
+            self._executor.shutdown()
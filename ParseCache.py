@@ -0,0 +1,83 @@
+#!/usr/bin/python3
+import hashlib
+import os
+import pickle
+
+import InputFiles
+import Profiler
+
+# Bump this whenever the layout of the cached tables changes, so old entries are never loaded.
+CACHE_VERSION = "2"
+
+DEFAULT_MAX_SIZE_MB = 512
+
+
+def hash_files(paths):
+    # Hash the content of the files, so a cache entry is reused no matter where the files were unzipped.
+    digest = hashlib.blake2b(CACHE_VERSION.encode("utf-8"), digest_size=20)
+    for path in paths:
+        Profiler.file_read(path)
+        with InputFiles.open_binary(path) as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                digest.update(chunk)
+        # Separate the files, so moving bytes from one file to the next changes the hash.
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """
+    On-disk cache of parsed tables, stored as one pickle file per entry.
+    Entries are keyed by the hash of the files they were parsed from. Once the cache grows over max_size_mb, the
+    least recently used entries are deleted.
+    """
+    def __init__(self, folder, max_size_mb=DEFAULT_MAX_SIZE_MB):
+        self._folder = folder
+        self._max_size = max_size_mb * 1024 * 1024
+        os.makedirs(folder, exist_ok=True)
+
+    def _get_path(self, key):
+        return os.path.join(self._folder, key + ".pickle")
+
+    def load(self, key):
+        path = self._get_path(key)
+        try:
+            with open(path, "rb") as f:
+                data = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+        Profiler.file_read(path)
+
+        # Mark the entry as recently used.
+        os.utime(path)
+        return data
+
+    def save(self, key, data):
+        path = self._get_path(key)
+        # Write to a temporary file first, so other builds sharing the cache never read half written entries.
+        temp_path = "%s.%d.tmp" % (path, os.getpid())
+        with open(temp_path, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+        Profiler.file_written(path)
+        self.evict()
+
+    def evict(self):
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self._folder):
+            if entry.is_file() and entry.name.endswith(".pickle"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total_size += stat.st_size
+
+        # Delete the least recently used entries first.
+        entries.sort()
+        for _, size, path in entries:
+            if total_size <= self._max_size:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_size -= size
@@ -0,0 +1,262 @@
+#!/usr/bin/python3
+import argparse
+import bisect
+import json
+import os
+
+import CardData
+import DiffData
+import GwentBuild
+import GwentUtils
+import StringTable
+
+"""
+The cards of many patches in one file. Each card is saved once in full, then only as a DiffData card diff for each
+patch it changed in. Patches it didn't change in aren't saved at all.
+    {"patches": [patch names, oldest first], "imageUrls": [base image url of each patch],
+     "cards": {card id: [[patch index, kind, data], ...]}}
+The default image url includes the patch, so the cards are saved like --art-urls template, with art.hasImages instead
+of their image urls, and the urls are made again from the patch's base image url when a card is read. Patches added
+from cards without image urls have null instead.
+Kinds of version:
+    card     the full card: when the card was added, added again after being removed, or every KEYFRAME_INTERVAL diffs
+    diff     the changes since the card's previous version
+    removed  the card isn't in the patch, data is null
+"""
+CARD = "card"
+DIFF = "diff"
+REMOVED = "removed"
+# A card is saved in full again after this many diffs in a row, so getting any version applies at most this many.
+KEYFRAME_INTERVAL = 16
+
+
+def _copy_art(card):
+    # A copy of the card that its art can be changed in.
+    card = dict(card)
+    card['variations'] = {variation_id: dict(variation, art=dict(variation['art'])) if variation.get('art') else variation
+                          for variation_id, variation in card.get('variations', {}).items()}
+    return card
+
+
+def _has_image_urls(cards):
+    return any(CardData.IMAGE_SIZES[0] in (variation.get('art') or {})
+               for card in cards.values() for variation in card.get('variations', {}).values())
+
+
+def _load_cards(filepath):
+    # A cards json saved by gwent.py in any format, including the --string-table files.
+    cards = GwentUtils.load_json(filepath)
+    if cards.get("format") == StringTable.FORMAT:
+        cards = dict(StringTable.StringTableCards(cards))
+    return cards
+
+
+class PatchArchive:
+    """
+    Adds the cards of each patch, in order, and gets the cards at any of them back.
+        archive = PatchArchive()
+        archive.add_patch("v8.0.0", cards)
+        archive.get_card("122101", "v8.0.0"), archive.get_history("122101"), archive.get_cards("v8.0.0")
+    Cards share dictionaries with the archive and each other, so they must not be changed.
+    """
+    def __init__(self, data=None):
+        data = data or {"patches": [], "imageUrls": [], "cards": {}}
+        self.patches = data["patches"]
+        self._image_urls = data.get("imageUrls", [None] * len(self.patches))
+        self._versions = data["cards"]
+        self._patch_indexes = {patch: index for index, patch in enumerate(self.patches)}
+        # The patch index of each version of each card, for bisect.
+        self._version_patches = {card_id: [version[0] for version in versions]
+                                 for card_id, versions in self._versions.items()}
+        # The cards of the newest patch, kept after add_patch so the next patch can be compared with them.
+        self._latest = None
+
+    def to_json(self):
+        return {"patches": self.patches, "imageUrls": self._image_urls, "cards": self._versions}
+
+    def card_ids(self):
+        # Every card that was in any patch.
+        return sorted(self._versions)
+
+    def _build_card(self, card_id, position):
+        # The card as of its version at position, None if it was removed.
+        versions = self._versions[card_id]
+        if versions[position][1] == REMOVED:
+            return None
+        start = position
+        while versions[start][1] == DIFF:
+            start -= 1
+        card = versions[start][2]
+        for version in versions[start + 1:position + 1]:
+            # apply_card_diff copies the dictionaries it changes, but updates the card itself.
+            card = DiffData.apply_card_diff(dict(card), version[2])
+        return card
+
+    def _get_saved_card(self, card_id, patch_index):
+        # The card as it was saved for the patch at patch_index, without image urls. None if it wasn't in it.
+        if card_id not in self._versions:
+            return None
+        position = bisect.bisect_right(self._version_patches[card_id], patch_index) - 1
+        if position < 0:
+            return None
+        return self._build_card(card_id, position)
+
+    def _get_saved_cards(self, patch_index):
+        cards = {}
+        for card_id in sorted(self._versions):
+            card = self._get_saved_card(card_id, patch_index)
+            if card is not None:
+                cards[card_id] = card
+        return cards
+
+    def _add_image_urls(self, cards, patch_index):
+        # Gives the cards the image urls they were added with, in place. Cards read from a patch without image urls
+        # keep art.hasImages.
+        base_image_url = self._image_urls[patch_index]
+        if base_image_url is not None:
+            for card_id in cards:
+                cards[card_id] = _copy_art(cards[card_id])
+            CardData.update_image_urls(cards, self.patches[patch_index], base_image_url)
+        return cards
+
+    def get_card(self, card_id, patch):
+        # The card as it was in patch, None if it wasn't in it.
+        patch_index = self._patch_indexes[patch]
+        card = self._get_saved_card(card_id, patch_index)
+        if card is None:
+            return None
+        return self._add_image_urls({card_id: card}, patch_index)[card_id]
+
+    def get_cards(self, patch):
+        # Every card in patch, like CardData.create_card_json.
+        patch_index = self._patch_indexes[patch]
+        return self._add_image_urls(self._get_saved_cards(patch_index), patch_index)
+
+    def get_history(self, card_id):
+        # Every patch the card changed in, oldest first:
+        #   {"patch": patch, "added": card}, {"patch": patch, "changed": card diff} or {"patch": patch, "removed": True}
+        # The cards have art.hasImages instead of their image urls, so new urls for each patch aren't changes.
+        history = []
+        card = None
+        for patch_index, kind, data in self._versions.get(card_id, []):
+            patch = self.patches[patch_index]
+            if kind == REMOVED:
+                history.append({"patch": patch, "removed": True})
+                card = None
+            elif kind == DIFF:
+                history.append({"patch": patch, "changed": data})
+                card = DiffData.apply_card_diff(dict(card), data)
+            elif card is None:
+                history.append({"patch": patch, "added": data})
+                card = data
+            else:
+                # Saved in full as a keyframe, but it's a change like any other.
+                history.append({"patch": patch, "changed": DiffData.diff_card(card, data)})
+                card = data
+        return history
+
+    def add_patch(self, patch, cards, base_image_url=GwentBuild.DEFAULT_IMAGE_URL):
+        # Adds the cards from CardData.create_card_json for a patch newer than every patch already added.
+        # base_image_url is the one the cards' image urls were made with, for the same patch name. Raises ValueError if
+        # the urls don't match it. It isn't used for cards saved with url_template.
+        if patch in self._patch_indexes:
+            raise ValueError("Patch " + patch + " is already in the archive")
+        if self._latest is None:
+            self._latest = self._get_saved_cards(len(self.patches) - 1) if self.patches else {}
+
+        if not _has_image_urls(cards):
+            base_image_url = None
+        else:
+            saved_cards = {}
+            for card_id, card in cards.items():
+                saved_card = CardData.update_image_urls({card_id: _copy_art(card)}, patch, base_image_url, True)[card_id]
+                if CardData.update_image_urls({card_id: _copy_art(saved_card)}, patch, base_image_url)[card_id] != card:
+                    raise ValueError("The image urls of card " + card_id + " weren't made from " + base_image_url +
+                                     " for patch " + patch)
+                saved_cards[card_id] = saved_card
+            cards = saved_cards
+
+        patch_index = len(self.patches)
+        self.patches.append(patch)
+        self._image_urls.append(base_image_url)
+        self._patch_indexes[patch] = patch_index
+
+        changed = 0
+        for card_id in sorted(cards):
+            card = cards[card_id]
+            old_card = self._latest.get(card_id)
+            if old_card is None:
+                version = [patch_index, CARD, card]
+            else:
+                diff = DiffData.diff_card(old_card, card)
+                if diff is None:
+                    continue
+                version = [patch_index, DIFF, diff]
+                versions = self._versions[card_id]
+                if len(versions) >= KEYFRAME_INTERVAL and all(kind == DIFF for _, kind, _ in versions[-KEYFRAME_INTERVAL:]):
+                    version = [patch_index, CARD, card]
+            self._add_version(card_id, version)
+            changed += 1
+
+        for card_id in self._latest:
+            if card_id not in cards:
+                self._add_version(card_id, [patch_index, REMOVED, None])
+                changed += 1
+
+        self._latest = cards
+        return changed
+
+    def _add_version(self, card_id, version):
+        self._versions.setdefault(card_id, []).append(version)
+        self._version_patches.setdefault(card_id, []).append(version[0])
+
+
+def load_archive(filepath):
+    # An empty archive if the file doesn't exist yet.
+    if not os.path.isfile(filepath):
+        return PatchArchive()
+    return PatchArchive(GwentUtils.load_json(filepath))
+
+
+def save_archive(archive, filepath):
+    GwentUtils.save_json(filepath, archive.to_json(), "minified", filepath.endswith(".gz"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep the cards of many patches in one archive, and get any card at any of them back.")
+    parser.add_argument("archive", help="Archive json file. Gzipped if it ends with .gz.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    add_parser = commands.add_parser("add", help="Add the cards json of a patch newer than every patch in the archive. Creates the archive if it doesn't exist.")
+    add_parser.add_argument("patch", help="Patch name e.g. v1.2.1.")
+    add_parser.add_argument("cards", help="Cards json file saved by gwent.py.")
+    add_parser.add_argument("-i", "--images", help="Base image url the cards were saved with, see gwent.py -i. Defaults to gwent.py's default image url.")
+    card_parser = commands.add_parser("card", help="Print a card as it was in a patch.")
+    card_parser.add_argument("card_id")
+    card_parser.add_argument("patch")
+    history_parser = commands.add_parser("history", help="Print every change to a card.")
+    history_parser.add_argument("card_id")
+    cards_parser = commands.add_parser("cards", help="Save every card in a patch, like the cards json of that patch.")
+    cards_parser.add_argument("patch")
+    cards_parser.add_argument("output", help="File to save the cards json to.")
+    commands.add_parser("patches", help="Print the patches in the archive.")
+    args = parser.parse_args()
+
+    archive = load_archive(args.archive)
+    if args.command in ["card", "cards"] and args.patch not in archive.patches:
+        exit("Unknown patch " + args.patch + ". Choose from: " + ", ".join(archive.patches))
+
+    if args.command == "add":
+        try:
+            changed = archive.add_patch(args.patch, _load_cards(args.cards), args.images or GwentBuild.DEFAULT_IMAGE_URL)
+        except ValueError as e:
+            exit(str(e))
+        print("Added %s with %d added, changed or removed cards." % (args.patch, changed))
+        save_archive(archive, args.archive)
+    elif args.command == "patches":
+        print("\n".join(archive.patches))
+    elif args.command == "card":
+        print(json.dumps(archive.get_card(args.card_id, args.patch), sort_keys=True, indent=2, ensure_ascii=False))
+    elif args.command == "history":
+        print(json.dumps(archive.get_history(args.card_id), sort_keys=True, indent=2, ensure_ascii=False))
+    else:
+        GwentUtils.save_json(args.output, archive.get_cards(args.patch))
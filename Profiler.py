@@ -0,0 +1,187 @@
+#!/usr/bin/python3
+import json
+import os
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+import InputFiles
+
+"""
+Records the wall time, CPU time and peak memory of each stage of a build, plus how many files were read and written.
+Does nothing until enable() is called, so the stages can stay in the code at no cost.
+    with Profiler.stage("parse Templates.xml"):
+        ...
+Stages can be nested. The peak memory of a stage includes the stages inside it. CPU time only covers this process, so
+work done in a process pool (--jobs) only shows up in the wall time. Stages on other threads, e.g. the OutputWriter
+threads, are never nested, only count that thread's CPU time and don't record their peak memory.
+"""
+_enabled = False
+_start = None
+_stages = []
+# Records of the stages that are still running, innermost last.
+_running = []
+_files = {"filesRead": 0, "bytesRead": 0, "filesWritten": 0, "bytesWritten": 0}
+# Files are also written on the OutputWriter threads.
+_files_lock = threading.Lock()
+
+
+def enable():
+    global _enabled, _start
+    _enabled = True
+    _start = (time.perf_counter(), time.process_time())
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def reset():
+    # Starts a new report, e.g. for each rebuild in --watch. The stages and files so far are forgotten, and the total
+    # time and peak memory start again from now.
+    global _start
+    if not _enabled:
+        return
+    del _stages[:]
+    with _files_lock:
+        for key in _files:
+            _files[key] = 0
+    _start = (time.perf_counter(), time.process_time())
+    tracemalloc.reset_peak()
+
+
+def is_enabled():
+    return _enabled
+
+
+def _update_running_peak():
+    # tracemalloc only keeps a single peak, so hand it to the innermost running stage before it is reset.
+    if _running:
+        _running[-1]["peakMemory"] = max(_running[-1]["peakMemory"], tracemalloc.get_traced_memory()[1])
+
+
+def _enter(record):
+    _update_running_peak()
+    tracemalloc.reset_peak()
+    _running.append(record)
+    return time.perf_counter(), time.process_time()
+
+
+def _exit(record, start):
+    record["wall"] += time.perf_counter() - start[0]
+    record["cpu"] += time.process_time() - start[1]
+    _update_running_peak()
+    _running.pop()
+    if _running:
+        _running[-1]["peakMemory"] = max(_running[-1]["peakMemory"], record["peakMemory"])
+    tracemalloc.reset_peak()
+
+
+def _new_record(name):
+    record = {"name": name, "depth": len(_running), "wall": 0.0, "cpu": 0.0, "peakMemory": 0}
+    # Keep the stages in the order they started.
+    _stages.append(record)
+    return record
+
+
+@contextmanager
+def _thread_stage(name):
+    # The running stages and the tracemalloc peak belong to the main thread, so they are left alone.
+    record = {"name": name, "depth": 0, "wall": 0.0, "cpu": 0.0, "peakMemory": 0}
+    _stages.append(record)
+    start = time.perf_counter(), time.thread_time()
+    try:
+        yield
+    finally:
+        record["wall"] += time.perf_counter() - start[0]
+        record["cpu"] += time.thread_time() - start[1]
+
+
+@contextmanager
+def stage(name):
+    if not _enabled:
+        yield
+        return
+    if threading.current_thread() is not threading.main_thread():
+        with _thread_stage(name):
+            yield
+        return
+
+    record = _new_record(name)
+    start = _enter(record)
+    try:
+        yield
+    finally:
+        _exit(record, start)
+
+
+def iterate(name, iterable):
+    # Yields the items of iterable, recording the time spent creating them as a stage. Used when the items are saved as
+    # they are created, so creating and saving show up separately.
+    if not _enabled:
+        yield from iterable
+        return
+
+    record = _new_record(name)
+    iterator = iter(iterable)
+    while True:
+        start = _enter(record)
+        try:
+            item = next(iterator)
+        except StopIteration:
+            return
+        finally:
+            _exit(record, start)
+        yield item
+
+
+def file_read(path):
+    if _enabled:
+        size = InputFiles.get_size(path)
+        with _files_lock:
+            _files["filesRead"] += 1
+            _files["bytesRead"] += size
+
+
+def file_written(path):
+    if _enabled:
+        size = os.path.getsize(path)
+        with _files_lock:
+            _files["filesWritten"] += 1
+            _files["bytesWritten"] += size
+
+
+def get_report():
+    report = {
+        "wall": time.perf_counter() - _start[0],
+        "cpu": time.process_time() - _start[1],
+        "peakMemory": max([record["peakMemory"] for record in _stages] + [tracemalloc.get_traced_memory()[1]]),
+        "stages": _stages
+    }
+    report.update(_files)
+    return report
+
+
+def _format_size(size):
+    for unit in ["B", "KB", "MB"]:
+        if size < 1024:
+            return "%.1f %s" % (size, unit)
+        size /= 1024
+    return "%.1f GB" % size
+
+
+def print_report():
+    report = get_report()
+    width = max([len("  " * record["depth"] + record["name"]) for record in report["stages"]] + [len("Stage")])
+    print("%-*s %10s %10s %12s" % (width, "Stage", "Wall (s)", "CPU (s)", "Peak memory"))
+    for record in report["stages"]:
+        print("%-*s %10.3f %10.3f %12s" % (width, "  " * record["depth"] + record["name"], record["wall"], record["cpu"],
+                                           _format_size(record["peakMemory"])))
+    print("%-*s %10.3f %10.3f %12s" % (width, "Total", report["wall"], report["cpu"], _format_size(report["peakMemory"])))
+    print("Read %d files (%s). Wrote %d files (%s)." % (report["filesRead"], _format_size(report["bytesRead"]),
+                                                        report["filesWritten"], _format_size(report["bytesWritten"])))
+
+
+def save_report(filepath):
+    with open(filepath, "w", encoding="utf-8", newline="\n") as f:
+        json.dump(get_report(), f, indent=2)
+    print("Saved profile to: %s" % filepath)
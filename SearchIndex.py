@@ -0,0 +1,156 @@
+#!/usr/bin/python3
+import bisect
+import math
+import re
+import unicodedata
+
+import GwentUtils
+
+"""
+Full text search over the card names, info and flavor text of each locale.
+Latin and Cyrillic text is split into words. Japanese, Korean and Chinese text isn't reliably split by spaces, so it is
+split into single characters and pairs of characters instead, which lets any part of a word be found.
+    index = SearchIndex(create_search_index(CardData.iter_card_json(...), locales))
+    index.search("en-US", "gera")
+"""
+NGRAM_LOCALES = ["ja-JP", "ko-KR", "zh-CN", "zh-TW"]
+# How much a match in each field counts towards a card's rank.
+FIELD_WEIGHTS = {"name": 4, "info": 2, "flavor": 1}
+WORD_REGEX = re.compile(r"\w+")
+
+
+def _normalise(text):
+    # Lower case and without accents, so "Géralt" is found with "geralt".
+    text = unicodedata.normalize("NFKD", text.casefold())
+    return "".join(character for character in text if not unicodedata.combining(character))
+
+
+def get_terms(text, locale):
+    # The terms text is indexed under, in order, including duplicates.
+    words = WORD_REGEX.findall(_normalise(text))
+    if locale not in NGRAM_LOCALES:
+        return words
+    terms = []
+    for word in words:
+        terms += word
+        terms += [word[index:index + 2] for index in range(len(word) - 1)]
+    return terms
+
+
+def _get_query_terms(query, locale):
+    words = WORD_REGEX.findall(_normalise(query))
+    if locale not in NGRAM_LOCALES:
+        return words
+    # Pairs already cover every character, unless a word is a single character.
+    terms = []
+    for word in words:
+        if len(word) == 1:
+            terms.append(word)
+        terms += [word[index:index + 2] for index in range(len(word) - 1)]
+    return terms
+
+
+def create_search_index(cards, locales):
+    # cards is anything GwentUtils.iter_entries takes.
+    # Returns {locale: {"ids": [card ids], "terms": [sorted terms], "postings": [[card, weight, card, weight...]]}}, with
+    # the postings of each term in the same order as the terms. Cards are referred to by their position in ids.
+    cards = GwentUtils.iter_entries(cards)
+
+    card_ids = []
+    postings = {locale: {} for locale in locales}
+    for card_id, card in cards:
+        card_index = len(card_ids)
+        card_ids.append(card_id)
+        for locale in locales:
+            locale_postings = postings[locale]
+            for field in FIELD_WEIGHTS:
+                text = (card.get(field) or {}).get(locale)
+                if not text:
+                    continue
+                for term in get_terms(text, locale):
+                    term_postings = locale_postings.setdefault(term, {})
+                    term_postings[card_index] = term_postings.get(card_index, 0) + FIELD_WEIGHTS[field]
+
+    index = {}
+    for locale in locales:
+        terms = sorted(postings[locale])
+        index[locale] = {
+            "ids": card_ids,
+            "terms": terms,
+            "postings": [[value for card_index in sorted(postings[locale][term])
+                          for value in (card_index, postings[locale][term][card_index])] for term in terms]
+        }
+    return index
+
+
+class SearchIndex:
+    """
+    Searches an index from create_search_index, e.g. after loading it from the saved json.
+    Every word of the query has to match. The last word also matches longer words that start with it, so results can
+    be shown while the query is typed. Cards are ranked by how often and in which fields the words appear, with rare
+    words counting for more.
+    """
+    def __init__(self, index):
+        self._index = index
+        # Postings of each locale as {term: {card: weight}}, made the first time the locale is searched.
+        self._postings = {}
+
+    def locales(self):
+        return list(self._index)
+
+    def _get_postings(self, locale):
+        postings = self._postings.get(locale)
+        if postings is None:
+            locale_index = self._index[locale]
+            postings = {}
+            for term, values in zip(locale_index["terms"], locale_index["postings"]):
+                postings[term] = dict(zip(values[0::2], values[1::2]))
+            self._postings[locale] = postings
+        return postings
+
+    def complete(self, locale, prefix, limit=None):
+        # The indexed terms that start with prefix, in order.
+        terms = self._index[locale]["terms"]
+        prefix = _normalise(prefix)
+        start = bisect.bisect_left(terms, prefix)
+        end = start
+        while end < len(terms) and terms[end].startswith(prefix) and (limit is None or end - start < limit):
+            end += 1
+        return terms[start:end]
+
+    def _get_term_scores(self, locale, term, prefix):
+        # {card: score} for one query term. A prefix matches every term that starts with it, and each card keeps the
+        # score of its best match.
+        postings = self._get_postings(locale)
+        card_count = len(self._index[locale]["ids"])
+        terms = self.complete(locale, term) if prefix else [term]
+        scores = {}
+        for matched_term in terms:
+            term_postings = postings.get(matched_term, {})
+            idf = math.log(1 + card_count / len(term_postings)) if term_postings else 0
+            for card_index, weight in term_postings.items():
+                score = weight * idf
+                if score > scores.get(card_index, 0):
+                    scores[card_index] = score
+        return scores
+
+    def search(self, locale, query, limit=20, prefix=True):
+        # Returns up to limit (card id, score) pairs, best first. Set prefix to False to only match whole words.
+        terms = _get_query_terms(query, locale)
+        if not terms:
+            return []
+
+        is_ngram = locale in NGRAM_LOCALES
+        term_scores = [self._get_term_scores(locale, term, prefix and not is_ngram and index == len(terms) - 1)
+                       for index, term in enumerate(terms)]
+        # Start from the term with the fewest cards, so the intersection stays small.
+        term_scores.sort(key=len)
+        scores = dict(term_scores[0])
+        for other in term_scores[1:]:
+            scores = {card_index: score + other[card_index] for card_index, score in scores.items() if card_index in other}
+
+        card_ids = self._index[locale]["ids"]
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], card_ids[item[0]]))
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [(card_ids[card_index], score) for card_index, score in ranked]
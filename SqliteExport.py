@@ -0,0 +1,223 @@
+#!/usr/bin/python3
+import json
+import os
+import sqlite3
+
+import CardData
+import GwentUtils
+import Profiler
+
+SCHEMA = """
+CREATE TABLE cards (
+    id TEXT PRIMARY KEY,
+    type TEXT,
+    card_type TEXT,
+    faction TEXT,
+    secondary_faction TEXT,
+    strength INTEGER,
+    provision INTEGER,
+    provision_boost INTEGER,
+    mulligans INTEGER,
+    reach INTEGER,
+    armor INTEGER,
+    artist TEXT,
+    released INTEGER,
+    positions TEXT,
+    loyalties TEXT
+);
+CREATE TABLE variations (
+    id TEXT PRIMARY KEY,
+    card_id TEXT NOT NULL REFERENCES cards(id),
+    availability TEXT,
+    collectible INTEGER,
+    rarity TEXT,
+    craft_standard INTEGER,
+    craft_premium INTEGER,
+    craft_upgrade INTEGER,
+    mill_standard INTEGER,
+    mill_premium INTEGER,
+    mill_upgrade INTEGER,
+    art_id TEXT
+);
+CREATE TABLE variation_images (
+    variation_id TEXT NOT NULL REFERENCES variations(id),
+    size TEXT NOT NULL,
+    url TEXT NOT NULL,
+    PRIMARY KEY (variation_id, size)
+) WITHOUT ROWID;
+CREATE TABLE card_text (
+    card_id TEXT NOT NULL REFERENCES cards(id),
+    locale TEXT NOT NULL,
+    name TEXT,
+    info TEXT,
+    info_raw TEXT,
+    flavor TEXT,
+    PRIMARY KEY (card_id, locale)
+) WITHOUT ROWID;
+CREATE TABLE keywords (
+    id TEXT NOT NULL,
+    locale TEXT NOT NULL,
+    raw TEXT,
+    text TEXT,
+    PRIMARY KEY (id, locale)
+) WITHOUT ROWID;
+CREATE TABLE categories (
+    id TEXT NOT NULL,
+    locale TEXT NOT NULL,
+    text TEXT,
+    PRIMARY KEY (id, locale)
+) WITHOUT ROWID;
+CREATE TABLE card_keywords (
+    card_id TEXT NOT NULL REFERENCES cards(id),
+    keyword_id TEXT NOT NULL,
+    PRIMARY KEY (card_id, keyword_id)
+) WITHOUT ROWID;
+CREATE TABLE card_categories (
+    card_id TEXT NOT NULL REFERENCES cards(id),
+    category_id TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    PRIMARY KEY (card_id, position)
+) WITHOUT ROWID;
+CREATE TABLE card_related (
+    card_id TEXT NOT NULL REFERENCES cards(id),
+    related_id TEXT NOT NULL,
+    PRIMARY KEY (card_id, related_id)
+) WITHOUT ROWID;
+
+CREATE INDEX cards_faction ON cards(faction, type);
+CREATE INDEX cards_secondary_faction ON cards(secondary_faction);
+CREATE INDEX cards_card_type ON cards(card_type);
+CREATE INDEX cards_provision ON cards(provision);
+CREATE INDEX cards_strength ON cards(strength);
+CREATE INDEX variations_card_id ON variations(card_id);
+CREATE INDEX variations_rarity ON variations(rarity);
+CREATE INDEX variations_availability ON variations(availability);
+CREATE INDEX card_text_locale ON card_text(locale, name);
+CREATE INDEX card_keywords_keyword_id ON card_keywords(keyword_id);
+CREATE INDEX card_categories_category_id ON card_categories(category_id);
+CREATE INDEX card_related_related_id ON card_related(related_id);
+"""
+
+# Full text search over the card names and info text. E.g.
+#   SELECT card_id FROM card_search WHERE card_search MATCH 'spawn' AND locale = 'en-US' ORDER BY rank
+FTS_SCHEMA = """
+CREATE VIRTUAL TABLE card_search USING fts5(
+    card_id UNINDEXED,
+    locale UNINDEXED,
+    name,
+    info,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+"""
+
+
+def _has_fts5(connection):
+    try:
+        connection.execute("CREATE VIRTUAL TABLE temp.fts5_check USING fts5(text)")
+        connection.execute("DROP TABLE temp.fts5_check")
+        return True
+    except sqlite3.OperationalError:
+        return False
+
+
+def _insert_card(connection, card_id, card, has_fts5):
+    connection.execute("INSERT INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+        card_id, card.get('type'), card.get('cardType'), card.get('faction'), card.get('secondaryFaction'),
+        card.get('strength'), card.get('provision'), card.get('provisionBoost'), card.get('mulligans'),
+        card.get('reach'), card.get('armor'), card.get('artist'), card.get('released'),
+        json.dumps(card.get('positions')), json.dumps(card.get('loyalties'))))
+
+    for variation_id in card['variations']:
+        variation = card['variations'][variation_id]
+        craft = variation.get('craft') or {}
+        mill = variation.get('mill') or {}
+        art = variation.get('art') or {}
+        connection.execute("INSERT INTO variations VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (
+            variation_id, card_id, variation.get('availability'), variation.get('collectible'), variation.get('rarity'),
+            craft.get('standard'), craft.get('premium'), craft.get('upgrade'),
+            mill.get('standard'), mill.get('premium'), mill.get('upgrade'), art.get('ingameArtId')))
+        connection.executemany("INSERT INTO variation_images VALUES (?, ?, ?)",
+                               [(variation_id, size, art[size]) for size in CardData.IMAGE_SIZES if size in art])
+
+    names = card.get('name') or {}
+    flavors = card.get('flavor') or {}
+    infos = card.get('info') or {}
+    raw_infos = card.get('infoRaw') or {}
+    locales = sorted(set(names) | set(flavors) | set(infos))
+    text_rows = [(card_id, locale, names.get(locale), infos.get(locale), raw_infos.get(locale), flavors.get(locale))
+                 for locale in locales]
+    connection.executemany("INSERT INTO card_text VALUES (?, ?, ?, ?, ?, ?)", text_rows)
+    if has_fts5:
+        connection.executemany("INSERT INTO card_search VALUES (?, ?, ?, ?)",
+                               [(card_id, locale, name, info) for card_id, locale, name, info, _, _ in text_rows])
+
+    connection.executemany("INSERT OR IGNORE INTO card_keywords VALUES (?, ?)",
+                           [(card_id, keyword_id) for keyword_id in card.get('keywords') or []])
+    connection.executemany("INSERT INTO card_categories VALUES (?, ?, ?)",
+                           [(card_id, category_id, position)
+                            for position, category_id in enumerate(card.get('categoryIds') or [])])
+    connection.executemany("INSERT OR IGNORE INTO card_related VALUES (?, ?)",
+                           [(card_id, related_id) for related_id in card.get('related') or []])
+
+
+def _write_database(connection, keywords, categories, cards):
+    # Nothing reads the file until it is finished, so there is no need for a journal.
+    connection.execute("PRAGMA journal_mode = OFF")
+    connection.execute("PRAGMA synchronous = OFF")
+    connection.executescript(SCHEMA)
+    has_fts5 = _has_fts5(connection)
+    if has_fts5:
+        connection.executescript(FTS_SCHEMA)
+    else:
+        print("SQLite was built without FTS5. Skipping the card_search table.")
+
+    with connection:
+        for keyword_id in keywords:
+            for locale in keywords[keyword_id]:
+                keyword = keywords[keyword_id][locale]
+                connection.execute("INSERT INTO keywords VALUES (?, ?, ?, ?)",
+                                   (keyword_id, locale, keyword['raw'], keyword['text']))
+
+        for category_id in categories:
+            for locale in categories[category_id]:
+                connection.execute("INSERT INTO categories VALUES (?, ?, ?)",
+                                   (category_id, locale, categories[category_id][locale]))
+
+        count = 0
+        for card_id, card in GwentUtils.iter_entries(cards):
+            _insert_card(connection, card_id, card, has_fts5)
+            count += 1
+
+    if has_fts5:
+        connection.execute("INSERT INTO card_search(card_search) VALUES ('optimize')")
+    connection.execute("ANALYZE")
+    connection.commit()
+    return count
+
+
+
+def save_sqlite(filepath, keywords, categories, cards):
+    # Saves the keywords, categories and cards as a normalised SQLite database.
+    # cards is anything GwentUtils.iter_entries takes.
+    # Returns the number of cards saved.
+
+    # Build the database next to its final location and move it into place at the end, so readers never open a
+    # half written file.
+    temp_path = filepath + ".tmp"
+    if os.path.exists(temp_path):
+        os.remove(temp_path)
+
+    connection = sqlite3.connect(temp_path)
+    try:
+        count = _write_database(connection, keywords, categories, cards)
+    except BaseException:
+        # Throw away the half written database, e.g. when creating the cards failed.
+        connection.close()
+        os.remove(temp_path)
+        raise
+    connection.close()
+
+    os.replace(temp_path, filepath)
+    Profiler.file_written(filepath)
+    print("Saved SQLite database to: %s" % filepath)
+    return count
@@ -0,0 +1,109 @@
+#!/usr/bin/python3
+import json
+from collections import Counter
+from collections.abc import Mapping
+
+import GwentUtils
+
+"""
+Cards json with every string saved once, in a shared table, and referred to by its index everywhere else.
+    {"format": "strings", "strings": ["en-US", "Neutral", ...], "cards": {card id: encoded card}}
+In an encoded card:
+    ints are indexes into strings
+    numbers are saved as their json text, e.g. 5 is "5", so they can't be mistaken for indexes
+    object keys are the index of the key as text, e.g. {"0": 1} is {"en-US": "Neutral"}
+    true, false, null and lists are unchanged
+The most used strings come first, so they get the shortest indexes.
+    cards = StringTableCards(json.load(f))
+    cards["122101"]
+"""
+FORMAT = "strings"
+
+
+def _count_strings(value, counts):
+    if isinstance(value, str):
+        counts[value] += 1
+    elif isinstance(value, dict):
+        for key, item in value.items():
+            counts[key] += 1
+            _count_strings(item, counts)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            _count_strings(item, counts)
+
+
+def _encode(value, indexes):
+    if isinstance(value, str):
+        return indexes[value]
+    if isinstance(value, bool) or value is None:
+        return value
+    if isinstance(value, (int, float)):
+        return json.dumps(value)
+    if isinstance(value, dict):
+        return {str(indexes[key]): _encode(item, indexes) for key, item in value.items()}
+    return [_encode(item, indexes) for item in value]
+
+
+def _decode(value, strings):
+    # type() instead of isinstance, since True and False are ints too.
+    value_type = type(value)
+    if value_type is int:
+        return strings[value]
+    if value_type is str:
+        # Almost every number is an int.
+        try:
+            return int(value)
+        except ValueError:
+            return json.loads(value)
+    if value_type is dict:
+        return {strings[int(key)]: _decode(item, strings) for key, item in value.items()}
+    if value_type is list:
+        return [_decode(item, strings) for item in value]
+    return value
+
+
+def create_string_table_json(cards):
+    # cards is anything GwentUtils.iter_entries takes. Every card is needed before the table can be sorted, so they are
+    # all held in memory.
+    cards = dict(GwentUtils.iter_entries(cards))
+
+    counts = Counter()
+    for card in cards.values():
+        _count_strings(card, counts)
+    # Ties keep the order the strings were first seen in, so the table is the same between runs.
+    strings = [string for string, count in counts.most_common()]
+    indexes = {string: index for index, string in enumerate(strings)}
+
+    return {
+        "format": FORMAT,
+        "strings": strings,
+        "cards": {card_id: _encode(cards[card_id], indexes) for card_id in cards}
+    }
+
+
+class StringTableCards(Mapping):
+    """
+    The cards from a create_string_table_json file, looked up like the dictionary from CardData.create_card_json. Each
+    card is only decoded the first time it is read.
+        cards = StringTableCards(json.load(f))
+        cards["122101"]['name']['en-US']
+    """
+    def __init__(self, data):
+        if data.get("format") != FORMAT:
+            raise ValueError("Not a string table cards json")
+        self._strings = data["strings"]
+        self._encoded = data["cards"]
+        self._cards = {}
+
+    def __getitem__(self, card_id):
+        card = self._cards.get(card_id)
+        if card is None:
+            card = _decode(self._encoded[card_id], self._strings)
+            self._cards[card_id] = card
+        return card
+
+    def __iter__(self):
+        return iter(self._encoded)
+
+    def __len__(self):
+        return len(self._encoded)
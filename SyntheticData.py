@@ -0,0 +1,112 @@
+#!/usr/bin/python3
+import argparse
+import os
+import random
+
+import CardData
+import GwentUtils
+
+"""
+Generates a fake data_definitions folder with the same structure as the real one, so the scripts can be tested and
+benchmarked without the game files. None of the generated text comes from Gwent.
+"""
+
+KEYWORDS = ["spawn", "boost", "damage", "lock", "veil", "shield", "deploy", "order", "zeal", "harmony"]
+COLLECTIBLE_SETS = sorted(CardData.COLLECTIBLE_SETS)
+
+
+def _template(rng, card_id, art_id):
+    tier = rng.choice([CardData.LEADER, CardData.BRONZE, CardData.BRONZE, CardData.SILVER, CardData.GOLD])
+    availability = rng.choice(COLLECTIBLE_SETS + [CardData.TOKEN_SET, CardData.TOKEN_SET])
+    lines = ['  <Template Id="%s" Availability="%d" ArtId="%s">' % (card_id, availability, art_id),
+             "    <Power>%d</Power>" % rng.randint(0, 15),
+             "    <Tier>%d</Tier>" % tier,
+             "    <Type>%d</Type>" % rng.choice(list(CardData.TYPES)),
+             "    <FactionId>%d</FactionId>" % rng.choice(list(CardData.FACTIONS))]
+    if rng.random() < 0.2:
+        lines.append("    <SecondaryFactionId>%d</SecondaryFactionId>" % rng.choice(list(CardData.FACTIONS)))
+    lines += ["    <Provision>%d</Provision>" % rng.randint(4, 15),
+              "    <MaxRange>%d</MaxRange>" % rng.choice([-1, -1, -1, 1, 2, 3]),
+              '    <Placement PlayerSide="%d" OpponentSide="%d" />' % (rng.choice([0, 1, 1]), rng.choice([0, 0, 0, 1]))]
+    for node in ["PrimaryCategory", "Categories"]:
+        lines.append('    <%s><e0 V="%d" /><e1 V="%d" /></%s>' % (
+            node, rng.getrandbits(rng.choice([0, 8, 32])), rng.getrandbits(rng.choice([0, 0, 16])), node))
+    lines.append("    <Rarity>%d</Rarity>" % rng.choice(list(CardData.RARITIES)))
+    if rng.random() < 0.2:
+        lines.append("    <Armor>%d</Armor>" % rng.randint(1, 6))
+    lines.append("  </Template>")
+    return lines
+
+
+def _ability(rng, card_id, card_ids, placeholders, token_fan_out):
+    lines = ['  <Ability Type="CardAbility" Template="%s">' % card_id, "    <PersistentVariables>"]
+    for index in range(placeholders):
+        lines.append('      <V Name="Value%d" Type="Int" V="%d" />' % (index, rng.randint(1, 10)))
+    lines += ["    </PersistentVariables>", "    <TemporaryVariables>"]
+    for index in range(token_fan_out):
+        lines.append('      <V Name="Token%d" Type="CardDefinition" TemplateId="%s" />' % (index, rng.choice(card_ids)))
+    lines += ["    </TemporaryVariables>", "  </Ability>"]
+    return lines
+
+
+def _tooltip(rng, placeholders):
+    words = ["<keyword=%s>%s</keyword>" % (keyword, keyword.title()) for keyword in rng.sample(KEYWORDS, 2)]
+    words += ["{Value%d}" % index for index in range(placeholders)]
+    words += ["lorem", "ipsum", "dolor", "sit", "amet"] * 3
+    rng.shuffle(words)
+    if rng.random() < 0.1:
+        words.append("{Card.MaxRange}")
+    if rng.random() < 0.1:
+        words.append("{Template.Provision}")
+    return " ".join(words)
+
+
+def generate(folder, cards=1500, locales=len(GwentUtils.LOCALES), placeholders=2, token_fan_out=1, seed=0):
+    # Writes Templates.xml, Abilities.xml, ArtDefinitions.xml and a localisation file for the first 'locales' locales.
+    rng = random.Random(seed)
+    card_ids = [str(100000 + index) for index in range(cards)]
+
+    templates = ["<Templates>"]
+    abilities = ["<Abilities>"]
+    art_definitions = ["<ArtDefinitions>"]
+    for index, card_id in enumerate(card_ids):
+        art_id = str(1000 + index)
+        templates += _template(rng, card_id, art_id)
+        abilities += _ability(rng, card_id, card_ids, placeholders, token_fan_out)
+        art_definitions.append('  <ArtDefinition ArtId="%s" ArtistName="Artist %d" />' % (art_id, index % 97))
+    templates.append("</Templates>")
+    abilities.append("</Abilities>")
+    art_definitions.append("</ArtDefinitions>")
+
+    os.makedirs(os.path.join(folder, "Localization"), exist_ok=True)
+    for file_name, lines in [("Templates.xml", templates), ("Abilities.xml", abilities),
+                             ("ArtDefinitions.xml", art_definitions)]:
+        with open(os.path.join(folder, file_name), "w", encoding="utf-8", newline="\n") as f:
+            f.write("\n".join(lines) + "\n")
+
+    tooltips = [_tooltip(rng, placeholders) for _ in card_ids]
+    for locale in GwentUtils.LOCALES[:locales]:
+        lines = ["Key;Value"]
+        for card_id, tooltip in zip(card_ids, tooltips):
+            lines.append('%s_name;"%s %s"' % (card_id, locale, card_id))
+            lines.append('%s_fluff;"%s flavor text for %s"' % (card_id, locale, card_id))
+            lines.append('%s_tooltip;"%s %s"' % (card_id, locale, tooltip))
+        for keyword in KEYWORDS:
+            lines.append('keyword_%s;"<b>%s</b> %s"' % (keyword, keyword.title(), locale))
+        for category in range(128):
+            lines.append('card_category_%d;"%s category %d"' % (category, locale, category))
+        path = os.path.join(folder, GwentUtils.LOCALISATION_FILE_NAMES[locale])
+        with open(path, "w", encoding="utf-8", newline="\n") as f:
+            f.write("\n".join(lines) + "\n")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Generate a fake data_definitions folder for testing and benchmarks.")
+    parser.add_argument("outputFolder", help="Folder to write the xml and localisation files to.")
+    parser.add_argument("--cards", type=int, default=1500, help="Number of card templates. Defaults to 1500.")
+    parser.add_argument("--locales", type=int, default=len(GwentUtils.LOCALES), help="Number of locales. Defaults to all of them.")
+    parser.add_argument("--placeholders", type=int, default=2, help="Ability placeholders per tooltip. Defaults to 2.")
+    parser.add_argument("--tokens", type=int, default=1, help="Tokens each card can create. Defaults to 1.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed. Defaults to 0.")
+    args = parser.parse_args()
+    generate(args.outputFolder, args.cards, args.locales, args.placeholders, args.tokens, args.seed)
@@ -0,0 +1,55 @@
+#!/usr/bin/python3
+from collections import deque
+
+
+class TokenGraph:
+    """
+    Which cards each card can create (spawns) and which cards can create each card (spawned_by).
+    Built from GwentDataHelper.tokens. Token ids that aren't cards are left out, so every edge points to a card.
+        graph = TokenGraph(helper.tokens)
+        graph.get_spawners("132302"), graph.get_reachable("122101")
+    """
+    def __init__(self, tokens):
+        self.spawns = {}
+        self.spawned_by = {}
+        for card_id in tokens:
+            self.spawns[card_id] = []
+            self.spawned_by[card_id] = []
+
+        for card_id in tokens:
+            for token_id in tokens[card_id]:
+                if token_id in self.spawns:
+                    self.spawns[card_id].append(token_id)
+                    self.spawned_by[token_id].append(card_id)
+
+    def get_tokens(self, card_id):
+        # The cards card_id creates directly.
+        return self.spawns.get(card_id, [])
+
+    def get_spawners(self, card_id):
+        # The cards that create card_id directly.
+        return self.spawned_by.get(card_id, [])
+
+    def get_reachable(self, card_id):
+        # Every card that can be created from card_id, including tokens created by its tokens.
+        return self._search(self.spawns, [card_id], ()) - {card_id}
+
+    def get_all_spawners(self, card_id):
+        # Every card that can lead to card_id being created.
+        return self._search(self.spawned_by, [card_id], ()) - {card_id}
+
+    def propagate(self, card_ids, skip=()):
+        # card_ids plus every card they can create. Cards in skip are never reached, so the tokens only they create
+        # aren't either. Each card and edge is visited once.
+        return self._search(self.spawns, card_ids, set(skip))
+
+    def _search(self, edges, start_ids, skip):
+        reached = set(start_ids)
+        queue = deque(reached)
+        while queue:
+            card_id = queue.popleft()
+            for next_id in edges.get(card_id, []):
+                if next_id not in reached and next_id not in skip:
+                    reached.add(next_id)
+                    queue.append(next_id)
+        return reached
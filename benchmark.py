@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from itertools import product
+
+import CardData
+import GwentUtils
+import SyntheticData
+
+STAGES = ["helper", "tooltips", "create_card_json", "save_json"]
+BASE_IMAGE_URL = "https://example.com/images/"
+
+
+def _get_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def _run_once(folder, locales, jobs, output_path):
+    # Times each stage of a build on its own. The helper is lazy, so the 'helper' stage forces it to read every table
+    # the later stages need, and the tooltips are evaluated here rather than inside create_card_json.
+    times = {}
+
+    start = time.perf_counter()
+    helper = GwentUtils.GwentDataHelper(folder, jobs, locales=locales)
+    helper.card_templates
+    helper.card_abilities
+    helper.artists
+    helper.card_names
+    times["helper"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    helper.tooltips
+    times["tooltips"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    cards = CardData.create_card_json(helper, "v1", BASE_IMAGE_URL)
+    times["create_card_json"] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    GwentUtils.save_json(output_path, cards)
+    times["save_json"] = time.perf_counter() - start
+
+    return times
+
+
+def run(card_counts, locale_counts=[len(GwentUtils.LOCALES)], placeholder_counts=[2], token_fan_outs=[1], repeat=3,
+        seed=0, jobs=1):
+    # Returns one result for every combination of card count, locale count, placeholder count and token fan out, with
+    # the fastest time of each stage over 'repeat' runs.
+    results = []
+    for cards, locales, placeholders, token_fan_out in product(card_counts, locale_counts, placeholder_counts,
+                                                                token_fan_outs):
+        with tempfile.TemporaryDirectory() as temp_folder:
+            folder = os.path.join(temp_folder, "data_definitions") + "/"
+            SyntheticData.generate(folder, cards, locales, placeholders, token_fan_out, seed)
+            output_path = os.path.join(temp_folder, "cards.json")
+
+            best = {}
+            for _ in range(repeat):
+                times = _run_once(folder, GwentUtils.LOCALES[:locales], jobs, output_path)
+                for stage in STAGES:
+                    best[stage] = min(best.get(stage, times[stage]), times[stage])
+
+        results.append({
+            "cards": cards,
+            "locales": locales,
+            "placeholders": placeholders,
+            "tokens": token_fan_out,
+            "seconds": best
+        })
+        print(_format_config(results[-1]) + "  ".join("%s %.3fs" % (stage, best[stage]) for stage in STAGES))
+    return results
+
+
+def _get_config(result):
+    return (result['cards'], result['locales'], result['placeholders'], result['tokens'])
+
+
+def _format_config(result):
+    return "%6d cards %2d locales %2d placeholders %2d tokens  " % _get_config(result)
+
+
+def compare(previous, current):
+    # Prints how much each stage changed for every configuration both result files have.
+    previous_results = {_get_config(result): result for result in previous['results']}
+    print("Compared to %s:" % (previous.get('commit') or previous.get('date')))
+    for result in current['results']:
+        old = previous_results.get(_get_config(result))
+        if old is None:
+            continue
+        changes = []
+        for stage in STAGES:
+            if stage in old['seconds'] and old['seconds'][stage] > 0:
+                ratio = result['seconds'][stage] / old['seconds'][stage]
+                changes.append("%s %+.1f%%" % (stage, (ratio - 1) * 100))
+        print(_format_config(result) + "  ".join(changes))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Time each stage of a build on generated data.")
+    parser.add_argument("--cards", default="500,1500,5000", help="Comma separated card counts to run. Defaults to 500,1500,5000.")
+    parser.add_argument("--locales", default=str(len(GwentUtils.LOCALES)), help="Comma separated numbers of locales. Defaults to all of them.")
+    parser.add_argument("--placeholders", default="2", help="Comma separated numbers of ability placeholders per tooltip. Defaults to 2.")
+    parser.add_argument("--tokens", default="1", help="Comma separated numbers of tokens each card can create. Defaults to 1.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of processes the helper uses for the tooltips. Defaults to 1.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per combination. The fastest run is kept. Defaults to 3.")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed for the generated data. Defaults to 0.")
+    parser.add_argument("-o", "--output", help="Save the results to this json file.")
+    parser.add_argument("--compare", help="Results file from an earlier run to compare against.")
+    args = parser.parse_args()
+
+    counts = {}
+    for option in ["cards", "locales", "placeholders", "tokens"]:
+        try:
+            counts[option] = [int(count) for count in getattr(args, option).split(",")]
+        except ValueError:
+            print("--" + option + " must be a comma separated list of numbers.")
+            exit()
+    if max(counts["locales"]) > len(GwentUtils.LOCALES):
+        exit("--locales can't be more than %d." % len(GwentUtils.LOCALES))
+
+    data = {
+        "commit": _get_commit(),
+        "date": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": sys.platform,
+        "results": run(counts["cards"], counts["locales"], counts["placeholders"], counts["tokens"], args.repeat,
+                       args.seed, args.jobs)
+    }
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8", newline="\n") as f:
+            json.dump(data, f, indent=2)
+        print("Saved results to: %s" % args.output)
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            compare(json.load(f), data)
@@ -2,65 +2,307 @@
 import argparse
 import os
 import sys
+import time
+import GwentBuild
 import GwentUtils
+import InputFiles
+import OutputWriter
+import ParseCache
+import Profiler
+import SqliteExport
+import SearchIndex
+import StringTable
 
 from datetime import datetime
 import CardData
 import KeywordData
 import CategoryData
+import DiffData
+import BinaryExport
 
-parser = argparse.ArgumentParser(description="Transform the Gwent card data contained in xml files into a "
-                                             "standardised JSON format. See README for more info.",
-                                 epilog="Usage example:\n./master_xml.py ./pathToXML v0-9-10",
-                                 formatter_class=argparse.RawTextHelpFormatter)
-parser.add_argument("inputFolder", help="unzipped data_definitions.zip. Folder containing the xml files.")
-parser.add_argument("-p", "--patch", help="Specifies the Gwent patch version. Used to create image urls.")
-parser.add_argument("-i", "--images", help="Base image url to use for card images. See README for more info.")
-parser.add_argument("-l", "--language", help="Includes just the translations for the selected language. Results in much smaller json files. Choose from: en-US, de-DE, es-ES, es-MX, fr-FR, it-IT, ja-JP, ko-KR, pl-PL, pt-BR, ru-RU, zh-CN, zh-TW")
-args = parser.parse_args()
-patch = args.patch
-rawFolder = args.inputFolder
-base_image_url = args.images
-locale = args.language
-if locale:
-    GwentUtils.LOCALES = [locale]
-if not base_image_url:
-    base_image_url = "https://firebasestorage.googleapis.com/v0/b/gwent-9e62a.appspot.com/o/images%2F{patch}%2F{cardId}%2F{variationId}%2F{size}.png?alt=media"
-    if not patch:
-        exit("Error: If you are not supplying an image url, you need to specify the patch name using --patch.\n"
-            "This is because the default image url uses the patch name to generate the image url.\n"
-            "See README for more info.")
-elif "{patch}" in base_image_url and not patch:
-    exit("Your image url contains {patch} but you have not supplied a patch name using -p. See README for more info")
-
-# Add a backslash on the end if it doesn't exist.
-if rawFolder[-1] != "/":
-    rawFolder = rawFolder + "/"
-
-if not os.path.isdir(rawFolder):
-    print(rawFolder + " is not a valid directory")
-    exit()
-
-gwentDataHelper = GwentUtils.GwentDataHelper(rawFolder)
-
-# Save under v0-9-10_2017-09-05.json if the script is ran on 5 September 2017 with patch v0-9-10.
-BASE_FILENAME = patch + "_" + datetime.utcnow().strftime("%Y-%m-%d") + ".json"
-
-print("Creating keyword JSON...")
-keywordsJson = KeywordData.create_keyword_json(gwentDataHelper)
-filename = "keywords_" + BASE_FILENAME
-filepath = os.path.join(rawFolder + "../" + filename)
-GwentUtils.save_json(filepath, keywordsJson)
-
-print("Creating categories JSON...")
-categoriesJson = CategoryData.create_category_json(gwentDataHelper)
-filename = "categories_" + BASE_FILENAME
-filepath = os.path.join(rawFolder + "../" + filename)
-GwentUtils.save_json(filepath, categoriesJson)
-
-print("Creating card data JSON...")
-cardsJson = CardData.create_card_json(gwentDataHelper, patch, base_image_url)
-filename = "cards_" + BASE_FILENAME
-filepath = os.path.join(rawFolder + "../" + filename)
-print("Found %s cards." % (len(cardsJson)))
-GwentUtils.save_json(filepath, cardsJson)
+# Seconds between checks for changed files in --watch.
+WATCH_INTERVAL = 0.5
+
+
+def get_watched_files(locales):
+    # The category names on the cards are read from their own locale, even if it isn't one of the output locales.
+    locales = set(locales) | {GwentUtils.CATEGORY_NAMES_LOCALE}
+    return list(GwentUtils.DATA_FILE_TABLES) + [GwentUtils.LOCALISATION_FILE_NAMES[locale] for locale in sorted(locales)]
+
+
+def save_sqlite(filepath, cards, keywords, categories):
+    # SqliteExport.save_sqlite with the cards first, for OutputWriter.save_stream.
+    return SqliteExport.save_sqlite(filepath, keywords, categories, cards)
+
+
+def _get_file_states(folder, files):
+    return {fileName: InputFiles.get_state(folder + fileName) for fileName in files}
+
+
+def wait_for_changes(folder, files):
+    # Polls the files until some of them change, then waits until they stop changing, so a file that is still being
+    # written isn't read. Returns the changed files.
+    states = _get_file_states(folder, files)
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        newStates = _get_file_states(folder, files)
+        if newStates != states:
+            break
+    while True:
+        time.sleep(WATCH_INTERVAL)
+        stableStates = _get_file_states(folder, files)
+        if stableStates == newStates:
+            break
+        newStates = stableStates
+    return [fileName for fileName in files if newStates[fileName] != states[fileName]]
+
+
+def get_changed_outputs(changedFiles, locales):
+    # The outputs and locales that depend on the changed files.
+    changedLocales = {locale for locale in locales if GwentUtils.LOCALISATION_FILE_NAMES[locale] in changedFiles}
+    changedXml = [fileName for fileName in changedFiles if fileName in GwentUtils.DATA_FILE_TABLES]
+
+    # Every file is used by the cards. The keywords and categories only come from the localisation files.
+    changedOutputs = ["cards"]
+    if changedLocales:
+        changedOutputs += ["keywords", "categories"]
+
+    # A localisation file only changes the files of its own language with --per-locale. The xml files and the category
+    # names change the cards of every language.
+    if changedXml or GwentUtils.LOCALISATION_FILE_NAMES[GwentUtils.CATEGORY_NAMES_LOCALE] in changedFiles:
+        changedLocales = set(locales)
+    return changedOutputs, changedLocales
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Transform the Gwent card data contained in xml files into a "
+                                                 "standardised JSON format. See README for more info.",
+                                     epilog="Usage example:\n./master_xml.py ./pathToXML v0-9-10",
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("inputFolder", help="data_definitions.zip, or the folder it was unzipped to. Folder containing the xml files.")
+    parser.add_argument("-p", "--patch", help="Specifies the Gwent patch version. Used to create image urls.")
+    parser.add_argument("-i", "--images", help="Base image url to use for card images. See README for more info.")
+    parser.add_argument("--art-urls", choices=["full", "template"], default="full", help="full: every card has the url of each image size (default). template: each card only has its art and variation ids, and the image url template is saved once in image_url_template_<patch>_<date>.json.")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="Number of processes used to process the locales in parallel. Defaults to 1.")
+    parser.add_argument("-c", "--cache", help="Folder used to cache the parsed data between runs. Files that haven't changed since a previous run are loaded from the cache instead of being parsed again.")
+    parser.add_argument("--cache-size", type=int, default=ParseCache.DEFAULT_MAX_SIZE_MB, help="Maximum size of the cache in MB. The least recently used entries are deleted first. Defaults to %d." % ParseCache.DEFAULT_MAX_SIZE_MB)
+    parser.add_argument("-d", "--diff", help="Previous data_definitions folder or zip, or cards json. Saves only the cards that were added, removed or changed since then, instead of all the cards.")
+    parser.add_argument("-f", "--format", choices=GwentUtils.OUTPUT_FORMATS, default="pretty", help="Format of the json files. pretty: indented (default). minified: no whitespace. ndjson: one entry per line.")
+    parser.add_argument("-z", "--gzip", action="store_true", help="Gzip the json files.")
+    parser.add_argument("-w", "--writers", type=int, default=0, help="Number of threads saving and compressing the files in the background, while the next file is created. Defaults to 0, which saves each file before moving on.")
+    parser.add_argument("--precompress", help="Also save compressed copies of every json file, separated by commas, e.g. gz,br. Choose from: " + ", ".join(OutputWriter.PRECOMPRESS_FORMATS) + ". br needs the brotli package.")
+    parser.add_argument("--sqlite", action="store_true", help="Also save the keywords, categories and cards as an SQLite database, with full text search over the card names and info.")
+    parser.add_argument("--binary", action="store_true", help="Also save the cards as a columnar binary store that can be opened with mmap. See BinaryExport.py.")
+    parser.add_argument("--search-index", action="store_true", help="Also save a full text search index over the card names, info and flavor text of each language. See SearchIndex.py.")
+    parser.add_argument("--string-table", action="store_true", help="Also save the cards with every string saved once in a shared table, for smaller files that are faster to parse. See StringTable.py.")
+    parser.add_argument("-o", "--outputs", default=",".join(GwentBuild.OUTPUTS), help="The json files to save, separated by commas. Only the data needed for them is read. Choose from: " + ", ".join(GwentBuild.OUTPUTS) + ". Defaults to all of them.")
+    parser.add_argument("-l", "--language", help="Includes just the translations for the selected language. Results in much smaller json files. Separate multiple languages with commas e.g. en-US,de-DE. Choose from: en-US, de-DE, es-ES, es-MX, fr-FR, it-IT, ja-JP, ko-KR, pl-PL, pt-BR, ru-RU, zh-CN, zh-TW")
+    parser.add_argument("--per-locale", action="store_true", help="Save a separate set of json files for each language e.g. cards_en-US_v1.2.1_2019-09-05.json. The xml files are only parsed once.")
+    parser.add_argument("--watch", action="store_true", help="Keep running and rebuild the outputs whenever a file in the input folder changes. Only the tables and files that depend on the changed files are rebuilt.")
+    parser.add_argument("--profile", action="store_true", help="Print the time, CPU time and peak memory of each stage, and how many files were read and written.")
+    parser.add_argument("--profile-json", help="Also save the --profile report to this json file. Implies --profile.")
+    args = parser.parse_args()
+    if args.profile or args.profile_json:
+        Profiler.enable()
+    patch = args.patch
+    inputPath = args.inputFolder
+    locales = GwentUtils.LOCALES
+    if args.language:
+        locales = args.language.split(",")
+    outputs = args.outputs.split(",")
+    try:
+        GwentBuild.check_locales(locales)
+        GwentBuild.check_outputs(outputs)
+        base_image_url = GwentBuild.get_image_url(patch, args.images)
+    except ValueError as e:
+        exit(str(e))
+    if args.per_locale and args.diff:
+        exit("--diff can't be combined with --per-locale.")
+    precompress = []
+    if args.precompress:
+        precompress = args.precompress.split(",")
+        for compression in precompress:
+            if compression not in OutputWriter.PRECOMPRESS_FORMATS:
+                exit("Unknown compression " + compression + ". Choose from: " + ", ".join(OutputWriter.PRECOMPRESS_FORMATS))
+        if args.gzip:
+            exit("--precompress can't be combined with --gzip.")
+    try:
+        writer = OutputWriter.OutputWriter(args.writers, precompress)
+    except ImportError as e:
+        exit(str(e))
+
+    urlTemplate = args.art_urls == "template"
+    imageUrlTemplate = CardData.get_image_url_template(patch, base_image_url)
+
+    rawFolder = InputFiles.get_input_folder(inputPath)
+    if rawFolder is None:
+        print(inputPath + " is not a valid directory or data_definitions zip")
+        exit()
+
+    # Save next to the data_definitions folder or zip.
+    if InputFiles.ZIP_SEPARATOR in rawFolder:
+        outputFolder = os.path.dirname(os.path.abspath(inputPath)) + "/"
+    else:
+        outputFolder = rawFolder + "../"
+
+    cache = None
+    if args.cache:
+        cache = ParseCache.ParseCache(args.cache, args.cache_size)
+
+    gwentDataHelper = GwentUtils.GwentDataHelper(rawFolder, args.jobs, cache, locales)
+
+    # Save under v0-9-10_2017-09-05.json if the script is ran on 5 September 2017 with patch v0-9-10.
+    extension = ".ndjson" if args.format == "ndjson" else ".json"
+    if args.gzip:
+        extension += ".gz"
+    BASE_NAME = patch + "_" + datetime.utcnow().strftime("%Y-%m-%d")
+    BASE_FILENAME = BASE_NAME + extension
+
+    # Either one set of files with every language, or one set per language.
+    if args.per_locale:
+        fileSets = [(locale + "_", [locale]) for locale in locales]
+    else:
+        fileSets = [("", locales)]
+
+    # Outputs and locales that changed since the last build. Everything the first time, then only what a change affects
+    # in --watch.
+    changedOutputs = GwentBuild.OUTPUTS
+    changedLocales = set(locales)
+    previousCardsJson = None
+    watchedFiles = get_watched_files(locales)
+
+    # Saved on its own, so the cards json only ever holds cards. It only depends on the options.
+    if urlTemplate and "cards" in outputs:
+        filename = "image_url_template_" + BASE_FILENAME
+        writer.save(GwentUtils.save_json, os.path.join(outputFolder, filename), imageUrlTemplate, args.format, args.gzip)
+
+    while True:
+        buildOutputs = [output for output in outputs if output in changedOutputs]
+        for filePrefix, outputLocales in fileSets:
+            if not set(outputLocales) & changedLocales:
+                continue
+
+            if "keywords" in buildOutputs or args.sqlite:
+                print("Creating keyword JSON...")
+                with Profiler.stage("create keywords"):
+                    keywordsJson = KeywordData.create_keyword_json(gwentDataHelper, outputLocales)
+            if "keywords" in buildOutputs:
+                filename = "keywords_" + filePrefix + BASE_FILENAME
+                filepath = os.path.join(outputFolder, filename)
+                writer.save(GwentUtils.save_json, filepath, keywordsJson, args.format, args.gzip)
+
+            if "categories" in buildOutputs or args.sqlite:
+                print("Creating categories JSON...")
+                with Profiler.stage("create categories"):
+                    categoriesJson = CategoryData.create_category_json(gwentDataHelper, outputLocales)
+            if "categories" in buildOutputs:
+                filename = "categories_" + filePrefix + BASE_FILENAME
+                filepath = os.path.join(outputFolder, filename)
+                writer.save(GwentUtils.save_json, filepath, categoriesJson, args.format, args.gzip)
+
+            if args.sqlite:
+                print("Creating SQLite database...")
+                filename = "gwent_" + filePrefix + BASE_NAME + ".sqlite"
+                filepath = os.path.join(outputFolder, filename)
+                cards = Profiler.iterate("create cards", CardData.iter_card_json(gwentDataHelper, patch, base_image_url, outputLocales))
+                writer.save_stream(save_sqlite, filepath, cards, keywordsJson, categoriesJson, precompress=False)
+
+            if args.binary and "cards" in changedOutputs:
+                print("Creating binary card store...")
+                filename = "cards_" + filePrefix + BASE_NAME + ".gwcb"
+                filepath = os.path.join(outputFolder, filename)
+                cards = Profiler.iterate("create cards", CardData.iter_card_json(gwentDataHelper, patch, base_image_url, outputLocales))
+                writer.save_stream(BinaryExport.save_binary, filepath, cards, outputLocales, precompress=False)
+
+            if args.search_index and "cards" in changedOutputs:
+                print("Creating search index...")
+                # Always minified, the postings are long lists of numbers.
+                filename = "search_" + filePrefix + BASE_NAME + (".json.gz" if args.gzip else ".json")
+                filepath = os.path.join(outputFolder, filename)
+                with Profiler.stage("create search index"):
+                    cards = Profiler.iterate("create cards", CardData.iter_card_json(gwentDataHelper, patch, base_image_url, outputLocales))
+                    searchIndexJson = SearchIndex.create_search_index(cards, outputLocales)
+                writer.save(GwentUtils.save_json, filepath, searchIndexJson, "minified", args.gzip)
+
+            if args.string_table and "cards" in changedOutputs:
+                print("Creating string table cards JSON...")
+                # Always minified, like the search index.
+                filename = "cards_strings_" + filePrefix + BASE_NAME + (".json.gz" if args.gzip else ".json")
+                filepath = os.path.join(outputFolder, filename)
+                with Profiler.stage("create string table"):
+                    cards = Profiler.iterate("create cards", CardData.iter_card_json(gwentDataHelper, patch, base_image_url, outputLocales, urlTemplate))
+                    stringTableJson = StringTable.create_string_table_json(cards)
+                writer.save(GwentUtils.save_json, filepath, stringTableJson, "minified", args.gzip)
+
+            if "cards" not in buildOutputs:
+                continue
+
+            print("Creating card data JSON...")
+            if not args.diff:
+                # Save the cards as they are created, instead of creating all of them first.
+                filename = "cards_" + filePrefix + BASE_FILENAME
+                filepath = os.path.join(outputFolder, filename)
+                cards = Profiler.iterate("create cards", CardData.iter_card_json(gwentDataHelper, patch, base_image_url, outputLocales, urlTemplate))
+                cardCount = writer.save_stream(GwentUtils.save_json, filepath, cards, args.format, args.gzip)
+                print("Found %s cards." % cardCount.result())
+                continue
+
+            with Profiler.stage("create cards"):
+                cardsJson = CardData.create_card_json(gwentDataHelper, patch, base_image_url, outputLocales, urlTemplate)
+            print("Found %s cards." % (len(cardsJson)))
+
+            print("Creating card diff JSON...")
+            # The previous cards never change, so --watch only loads them once.
+            if previousCardsJson is None:
+                previousFolder = InputFiles.get_input_folder(args.diff)
+                if previousFolder is not None:
+                    previousHelper = GwentUtils.GwentDataHelper(previousFolder, args.jobs, cache, locales)
+                    with Profiler.stage("create previous cards"):
+                        previousCardsJson = CardData.create_card_json(previousHelper, patch, base_image_url, url_template=urlTemplate)
+                elif os.path.isfile(args.diff):
+                    Profiler.file_read(args.diff)
+                    with Profiler.stage("load " + os.path.basename(args.diff)):
+                        previousCardsJson = GwentUtils.load_json(args.diff)
+                    # Only compare the image urls made for this patch, or neither card's urls with --art-urls template.
+                    CardData.update_image_urls(previousCardsJson, patch, base_image_url, urlTemplate)
+                else:
+                    print(args.diff + " is not a valid directory, zip or file")
+                    exit()
+
+            with Profiler.stage("diff cards"):
+                diffJson = DiffData.create_diff_json(previousCardsJson, cardsJson)
+            print("Found %s added, %s removed and %s changed cards." % (len(diffJson["added"]), len(diffJson["removed"]), len(diffJson["changed"])))
+            filename = "cards_diff_" + filePrefix + BASE_FILENAME
+            filepath = os.path.join(outputFolder, filename)
+            writer.save(GwentUtils.save_json, filepath, diffJson, args.format, args.gzip)
+
+        writer.wait()
+        if Profiler.is_enabled():
+            Profiler.print_report()
+            if args.profile_json:
+                Profiler.save_report(args.profile_json)
+
+        if not args.watch:
+            break
+
+        # Wait for the next change, then only rebuild what depends on the changed files.
+        print("Watching %s for changes..." % rawFolder)
+        try:
+            changedFiles = wait_for_changes(rawFolder, watchedFiles)
+        except KeyboardInterrupt:
+            break
+        print("Changed: " + ", ".join(changedFiles))
+        # Each rebuild gets its own --profile report, without the time spent waiting.
+        Profiler.reset()
+        for fileName in changedFiles:
+            gwentDataHelper.file_changed(fileName)
+        changedOutputs, changedLocales = get_changed_outputs(changedFiles, locales)
+
+    writer.close()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except FileNotFoundError as e:
+        exit(str(e))